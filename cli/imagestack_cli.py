@@ -1,108 +1,189 @@
 # cli/imagestack_cli.py
 
 import argparse
+import atexit
 import os
 from pathlib import Path
-import datetime as dt
 
 import httpx
+import ijson
+import orjson
+
+from photobrain.query_cache import QueryCache, make_key
 
 
 API_BASE = "http://localhost:8090"
 
+_client: httpx.Client | None = None
+
 
 # ---------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------
 
+def _get_client() -> httpx.Client:
+    """Shared keep-alive client so repeated calls reuse one connection pool."""
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            base_url=API_BASE,
+            timeout=300.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        atexit.register(_client.close)
+    return _client
+
+
+def _print_match(m):
+    print(f"\n--- Match (score {m.get('score'):.4f}) ---")
+    print(f"ID: {m.get('id')}")
+    print(f"File: {m.get('filename')}")
+    print(f"Raw Path: {m.get('path_raw')}")
+    if m.get("ocr_text"):
+        print("OCR:")
+        print(m["ocr_text"])
+    if m.get("metadata", {}).get("exif"):
+        ex = m["metadata"]["exif"]
+        dt_orig = ex.get("datetime_original")
+        dev = ex.get("device_model") or ex.get("Model")
+        if dt_orig:
+            print(f"Captured: {dt_orig}")
+        if dev:
+            print(f"Device: {dev}")
+
+
 def _print_matches(matches):
     if not matches:
         print("[no results]")
         return
 
     for m in matches:
-        print(f"\n--- Match (score {m.get('score'):.4f}) ---")
-        print(f"ID: {m.get('id')}")
-        print(f"File: {m.get('filename')}")
-        print(f"Raw Path: {m.get('path_raw')}")
-        if m.get("ocr_text"):
-            print("OCR:")
-            print(m["ocr_text"])
-        if m.get("metadata", {}).get("exif"):
-            ex = m["metadata"]["exif"]
-            dt_orig = ex.get("datetime_original")
-            dev = ex.get("device_model") or ex.get("Model")
-            if dt_orig:
-                print(f"Captured: {dt_orig}")
-            if dev:
-                print(f"Device: {dev}")
+        _print_match(m)
+
+
+def _print_answer_stream(chunks):
+    """
+    Print a /photobrain/query response while it downloads.
+
+    The server serializes `answer` before `matches`, so the answer prints
+    from the first chunks and each match prints as soon as its object
+    closes; only one match is held in memory at a time.
+    """
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    builder = None
+    n_matches = 0
+
+    for chunk in chunks:
+        parser.send(chunk)
+        for prefix, event, value in events:
+            if prefix == "answer" and event == "string":
+                print("\n=== ANSWER ===")
+                print(value)
+                print()
+                print("=== MATCHES ===")
+            elif prefix == "matches.item" and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif builder is not None:
+                builder.event(event, value)
+                if prefix == "matches.item" and event == "end_map":
+                    _print_match(builder.value)
+                    n_matches += 1
+                    builder = None
+        del events[:]
+    parser.close()
+
+    if not n_matches:
+        print("[no results]")
+    print()
 
 
 # ---------------------------------------------------------
 # New sugar commands
 # ---------------------------------------------------------
 
-def photobrain_find(query: str, days: int | None = None, tag: str | None = None):
+def photobrain_find(
+    query: str,
+    days: int | None = None,
+    tag: str | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+):
     payload = {"query": query, "top_k": 12}
 
-    print(f"[find] Searching PhotoBrain: {query!r}")
-    resp = httpx.post(
-        f"{API_BASE}/photobrain/search/text",
-        json=payload,
-        timeout=120.0,
-    )
-    resp.raise_for_status()
-    data = resp.json()
-
-    matches = data.get("matches", [])
-
-    # optional client-side filters
+    # Filters run server-side (PhotoBrainFilterRequest), which over-fetches
+    # before filtering so top_k still fills up
+    filters = {}
     if days is not None:
-        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
-        def _within_days(m):
-            ts = m.get("ingested_at")
-            try:
-                if ts:
-                    d = dt.datetime.fromisoformat(ts)
-                    return d >= cutoff
-            except Exception:
-                pass
-            return False
-
-        matches = [m for m in matches if _within_days(m)]
-
+        filters["days"] = days
     if tag is not None:
-        tag = tag.lower().strip()
-        def _has_tag(m):
-            meta = m.get("metadata", {})
-            tags = meta.get("tags") or []
-            return any(tag in t.lower() for t in tags)
+        filters["tag"] = tag.strip()
+    if filters:
+        payload["filters"] = filters
 
-        matches = [m for m in matches if _has_tag(m)]
+    print(f"[find] Searching PhotoBrain: {query!r}")
+    cache = QueryCache() if use_cache else None
+    key = make_key("find", query, payload["top_k"], days, tag)
+    try:
+        body = cache.get(key) if cache and not refresh else None
+        if body is not None:
+            print("[find] (cached result)")
+        else:
+            resp = _get_client().post(
+                "/photobrain/search/text",
+                json=payload,
+                timeout=120.0,
+            )
+            resp.raise_for_status()
+            body = resp.content
+            if cache:
+                cache.set(key, body)
+    finally:
+        if cache:
+            cache.close()
+
+    data = orjson.loads(body)
 
-    _print_matches(matches)
+    _print_matches(data.get("matches", []))
     return 0
 
 
-def photobrain_ask(question: str, top_k: int = 8):
+def photobrain_ask(question: str, top_k: int = 8, use_cache: bool = True, refresh: bool = False):
     payload = {"question": question, "top_k": top_k}
 
     print(f"[ask] Asking PhotoBrain: {question!r}")
-    resp = httpx.post(
-        f"{API_BASE}/photobrain/query",
-        json=payload,
-        timeout=240.0,
-    )
-    resp.raise_for_status()
-    data = resp.json()
-
-    print("\n=== ANSWER ===")
-    print(data.get("answer", ""))
-    print()
-
-    print("=== MATCHES ===")
-    _print_matches(data.get("matches", []))
-    print()
+    cache = QueryCache() if use_cache else None
+    key = make_key("ask", question, top_k)
+    try:
+        body = cache.get(key) if cache and not refresh else None
+        if body is not None:
+            print("[ask] (cached answer)")
+            _print_answer_stream([body])
+            return 0
+
+        chunks: list[bytes] = []
+
+        def _tee(it):
+            for chunk in it:
+                chunks.append(chunk)
+                yield chunk
+
+        with _get_client().stream(
+            "POST",
+            "/photobrain/query",
+            json=payload,
+            timeout=240.0,
+        ) as resp:
+            resp.raise_for_status()
+            stream = resp.iter_bytes()
+            _print_answer_stream(_tee(stream) if cache else stream)
+
+        if cache:
+            cache.set(key, b"".join(chunks))
+    finally:
+        if cache:
+            cache.close()
 
     return 0
 
@@ -120,9 +201,9 @@ def describe_image(path: str):
     with open(path, "rb") as f:
         files = {"file": (os.path.basename(path), f, "image/jpeg")}
 
-        resp = httpx.post(f"{API_BASE}/vision/describe", files=files, timeout=300.0)
+        resp = _get_client().post("/vision/describe", files=files, timeout=300.0)
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
 
     print("=== DESCRIPTION ===")
     print(data.get("description", ""))
@@ -144,14 +225,14 @@ def ocr_image(path: str, preprocess: bool = False):
         files = {"file": (os.path.basename(path), f, "image/jpeg")}
         params = {"preprocess": "true"} if preprocess else {}
 
-        resp = httpx.post(
-            f"{API_BASE}/ocr/text",
+        resp = _get_client().post(
+            "/ocr/text",
             params=params,
             files=files,
             timeout=300.0,
         )
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
 
     print("=== OCR TEXT ===")
     print(data.get("text", ""))
@@ -206,12 +287,16 @@ def main():
     p_find = sub.add_parser("find", help="Semantic search over your image memory")
     p_find.add_argument("query", help="Search text (e.g., 'beach sunset' or 'receipt Home Depot')")
     p_find.add_argument("--days", type=int, help="Limit to images from last N days")
-    p_find.add_argument("--tag", type=str, help="Filter by tag (client-side)")
+    p_find.add_argument("--tag", type=str, help="Filter by tag (substring match)")
+    p_find.add_argument("--no-cache", action="store_true", help="Bypass the local query cache")
+    p_find.add_argument("--refresh", action="store_true", help="Ignore cached results and re-query")
 
     # ask (LLM QA over PhotoBrain)
     p_ask = sub.add_parser("ask", help="Ask questions about your stored images")
     p_ask.add_argument("question", help="Natural language question (e.g., 'What is my generator serial number?')")
     p_ask.add_argument("--top-k", type=int, default=8, help="Number of images to consider")
+    p_ask.add_argument("--no-cache", action="store_true", help="Bypass the local query cache")
+    p_ask.add_argument("--refresh", action="store_true", help="Ignore cached answer and re-ask")
 
     # watch (background watcher)
     p_watch = sub.add_parser("watch", help="Run PhotoBrain background watcher (real-time auto-ingestion)")
@@ -223,9 +308,20 @@ def main():
     elif args.command == "ocr":
         return ocr_image(args.path, preprocess=getattr(args, "preprocess", False))
     elif args.command == "find":
-        return photobrain_find(args.query, days=args.days, tag=args.tag)
+        return photobrain_find(
+            args.query,
+            days=args.days,
+            tag=args.tag,
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+        )
     elif args.command == "ask":
-        return photobrain_ask(args.question, top_k=args.top_k)
+        return photobrain_ask(
+            args.question,
+            top_k=args.top_k,
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+        )
     elif args.command == "watch":
         return run_watcher()
     else:
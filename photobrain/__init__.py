@@ -9,5 +9,5 @@ This package is responsible for:
 - Sending images to ImageStack's ImageRAG ingestion endpoint
 """
 
-__all__ = ["settings", "index_store", "ingestor"]
+__all__ = ["settings", "index_store", "ingestor", "query_cache"]
 
@@ -3,9 +3,8 @@
 from __future__ import annotations
 
 import sqlite3
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, NamedTuple, Optional
 
 from loguru import logger
 
@@ -14,17 +13,36 @@ _SCHEMA = """
 CREATE TABLE IF NOT EXISTS files (
     path TEXT PRIMARY KEY,
     mtime REAL NOT NULL,
+    size INTEGER NOT NULL DEFAULT -1,
     hash TEXT NOT NULL,
+    hash_alg TEXT NOT NULL DEFAULT 'sha256',
     last_ingested_utc REAL NOT NULL
 );
 """
 
+_COLUMNS = "path, mtime, size, hash, hash_alg, last_ingested_utc"
+_SELECT_ONE = f"SELECT {_COLUMNS} FROM files WHERE path = ?"
+_SELECT_ALL = f"SELECT {_COLUMNS} FROM files"
 
-@dataclass
-class FileRecord:
+_UPSERT = """
+INSERT INTO files (path, mtime, size, hash, hash_alg, last_ingested_utc)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+  mtime = excluded.mtime,
+  size = excluded.size,
+  hash = excluded.hash,
+  hash_alg = excluded.hash_alg,
+  last_ingested_utc = excluded.last_ingested_utc;
+"""
+
+
+class FileRecord(NamedTuple):
+    # Field order matches _COLUMNS, so records bind straight into SQL
     path: str
     mtime: float
+    size: int
     hash: str
+    hash_alg: str
     last_ingested_utc: float
 
 
@@ -34,32 +52,47 @@ class IndexStore:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._conn = sqlite3.connect(str(self.db_path))
         self._conn.execute("PRAGMA journal_mode = WAL;")
+        # WAL + NORMAL only fsyncs at checkpoints; the index is rebuildable
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute("PRAGMA temp_store = MEMORY;")
+        # Serve reads from a 256 MB memory map plus a 64 MB page cache
+        self._conn.execute("PRAGMA mmap_size = 268435456;")
+        self._conn.execute("PRAGMA cache_size = -65536;")
         self._conn.execute(_SCHEMA)
+        self._migrate()
         self._conn.commit()
         logger.info(f"[PhotoBrain] Index DB initialized at {self.db_path}")
 
+    def _migrate(self) -> None:
+        cols = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if "size" not in cols:
+            # Older DBs tracked mtime only; size is backfilled on the next hash
+            logger.info("[PhotoBrain] Migrating index DB: adding files.size")
+            self._conn.execute("ALTER TABLE files ADD COLUMN size INTEGER NOT NULL DEFAULT -1")
+        if "hash_alg" not in cols:
+            # Rows written before hash_alg existed were all SHA-256
+            logger.info("[PhotoBrain] Migrating index DB: adding files.hash_alg")
+            self._conn.execute("ALTER TABLE files ADD COLUMN hash_alg TEXT NOT NULL DEFAULT 'sha256'")
+
     def close(self):
         self._conn.close()
 
     def get(self, path: str) -> Optional[FileRecord]:
-        cur = self._conn.cursor()
-        cur.execute("SELECT path, mtime, hash, last_ingested_utc FROM files WHERE path = ?", (path,))
-        row = cur.fetchone()
+        # Same SQL string every call → served from sqlite3's statement cache
+        row = self._conn.execute(_SELECT_ONE, (path,)).fetchone()
         if not row:
             return None
         return FileRecord(*row)
 
+    def load_all(self) -> Dict[str, FileRecord]:
+        """Fetch every record in one query, keyed by path (for full scans)."""
+        return {row[0]: FileRecord(*row) for row in self._conn.execute(_SELECT_ALL)}
+
     def upsert(self, record: FileRecord) -> None:
-        self._conn.execute(
-            """
-            INSERT INTO files (path, mtime, hash, last_ingested_utc)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(path) DO UPDATE SET
-              mtime = excluded.mtime,
-              hash = excluded.hash,
-              last_ingested_utc = excluded.last_ingested_utc;
-            """,
-            (record.path, record.mtime, record.hash, record.last_ingested_utc),
-        )
+        self._conn.execute(_UPSERT, record)
         self._conn.commit()
 
+    def upsert_many(self, records: Iterable[FileRecord]) -> None:
+        """Upsert all records in a single transaction (one commit)."""
+        with self._conn:
+            self._conn.executemany(_UPSERT, records)
@@ -2,39 +2,100 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import mimetypes
 import os
+import stat as stat_mod
+import threading
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple
 
 import httpx
+import orjson
 from loguru import logger
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+try:
+    from blake3 import blake3
+except ImportError:  # pragma: no cover - optional speedup
+    blake3 = None
 
 from .settings import settings
 from .index_store import IndexStore, FileRecord
 
 
-def _iter_candidate_files(root_dirs: Iterable[Path], include_exts: set[str]) -> Iterable[Path]:
+# Typical junk dirs, matched against DirEntry.name before descending
+_SKIP_DIRS = frozenset({".git", "__pycache__", "node_modules", ".venv", "env"})
+
+
+# (path, stat) of a file that may need hashing/ingesting; the path stays a
+# str so the common skip path never builds a Path object
+Candidate = Tuple[str, os.stat_result]
+
+
+def _normalize_exts(include_exts: Iterable[str]) -> frozenset[str]:
+    # Bare lowercase suffixes ("jpg"), so names are matched without Path()
+    return frozenset(e.lower().lstrip(".") for e in include_exts)
+
+
+def _has_ext(name: str, exts: frozenset[str]) -> bool:
+    stem, _, ext = name.rpartition(".")
+    return bool(stem) and ext.lower() in exts
+
+
+def _iter_candidate_files(root_dirs: Iterable[Path], include_exts: set[str]) -> Iterable[os.DirEntry]:
+    """
+    Walk the roots with os.scandir and yield matching file entries.
+
+    DirEntry caches the stat data from the directory listing (always on
+    Windows, and for the file type on Linux), so callers should use
+    entry.stat() instead of stat-ing the path again.
+    """
+    exts = _normalize_exts(include_exts)
     for root in root_dirs:
         if not root.exists():
             continue
-        for dirpath, dirnames, filenames in os.walk(root):
-            # Skip some typical junk dirs
-            dirpath_path = Path(dirpath)
-            if any(skip in dirpath_path.parts for skip in (".git", "__pycache__", "node_modules", ".venv", "env")):
+        pending = [os.fspath(root)]
+        while pending:
+            try:
+                it = os.scandir(pending.pop())
+            except OSError:
                 continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in _SKIP_DIRS:
+                                pending.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
 
-            for name in filenames:
-                ext = Path(name).suffix.lower()
-                if ext not in include_exts:
-                    continue
-                yield Path(dirpath) / name
+                    if _has_ext(entry.name, exts):
+                        yield entry
+
+
+# Content fingerprint only (change detection), not a security boundary.
+# BLAKE3 hashes an mmap of the file with SIMD across threads; SHA-256 is
+# the fallback and what every row written before hash_alg existed used.
+HASH_ALG = "blake3" if blake3 is not None else "sha256"
+
+
+def _hash_file(path: Path, alg: str = HASH_ALG, chunk_size: int = 1 << 20) -> str:
+    if alg == "blake3":
+        return blake3(max_threads=blake3.AUTO).update_mmap(str(path)).hexdigest()
 
+    # Python 3.11+: read+hash loop runs in C with the GIL released
+    if hasattr(hashlib, "file_digest"):
+        with path.open("rb", buffering=0) as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
 
-def _hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
     h = hashlib.sha256()
     with path.open("rb") as f:
         while True:
@@ -45,11 +106,7 @@ def _hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
     return h.hexdigest()
 
 
-def _now_utc_ts() -> float:
-    return datetime.now(timezone.utc).timestamp()
-
-
-def ingest_file_to_imagestack(path: Path) -> dict:
+async def ingest_file_to_imagestack(client: httpx.AsyncClient, path: Path) -> dict:
     """
     Sends the file to ImageStack's PhotoBrain image-ingest endpoint.
 
@@ -60,93 +117,323 @@ def ingest_file_to_imagestack(path: Path) -> dict:
 
     Returns: parsed JSON response (dict)
     """
-    url = f"{settings.base_url.rstrip('/')}/photobrain/ingest"
     mime, _ = mimetypes.guess_type(str(path))
     if not mime or not mime.startswith("image/"):
         # Fallback, the server will still try to decode
         mime = "image/jpeg"
 
-    with path.open("rb") as f, httpx.Client(timeout=300.0) as client:
+    url = client.base_url.join("photobrain/ingest")
+    # Pass the open handle, never f.read(): httpx streams file fields in
+    # 64 KiB chunks and sizes Content-Length from fstat, so memory per
+    # upload stays O(chunk) regardless of image size.
+    with path.open("rb") as f:
         files = {"file": (path.name, f, mime)}
         logger.info(f"[PhotoBrain] Ingesting {path} → {url}")
-        resp = client.post(url, files=files)
+        resp = await client.post(url, files=files)
         resp.raise_for_status()
-        data = resp.json()
+        data = orjson.loads(resp.content)
         logger.info(f"[PhotoBrain] Ingested {path.name} → {data}")
         return data
 
 
-def scan_once(store: IndexStore) -> int:
+# blake3 and hashlib release the GIL while digesting, so threads hash files in parallel
+_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+# Index rows are written every this many results, so an interrupted first
+# scan keeps what it already uploaded
+_FLUSH_EVERY = 200
+
+
+async def _ingest_async(
+    store: IndexStore,
+    candidates: Iterable[Candidate],
+    lookup: Callable[[str], Optional[FileRecord]],
+    hash_pool: ThreadPoolExecutor,
+) -> int:
     """
-    Run a single scan over all watched directories.
+    Hash, ingest and index the given candidates. Index rows are flushed as
+    results come in (every _FLUSH_EVERY records, and on exit).
 
-    Returns: number of files ingested this run.
+    Checks run cheapest first: the (mtime, size) fingerprint comes from the
+    stat the caller already has, so unchanged files are never opened. Only
+    a changed fingerprint leads to hashing, and only a changed hash leads to
+    an upload.
     """
-    logger.info("[PhotoBrain] Scan started")
+    loop = asyncio.get_running_loop()
+    upload_slots = asyncio.Semaphore(settings.max_concurrent_ingests)
+
+    # One timestamp per batch is precise enough for last_ingested_utc
+    now_ts = time.time()
+
+    async def _process(
+        client: httpx.AsyncClient,
+        spath: str,
+        stat: os.stat_result,
+        rec: Optional[FileRecord],
+    ) -> tuple[Optional[FileRecord], bool]:
+        path = Path(spath)
 
-    ingested_count = 0
-    for path in _iter_candidate_files(settings.watch_dirs, settings.include_extensions):
         try:
-            stat = path.stat()
+            # New or modified file → compute hash on the hashing pool
+            file_hash = await loop.run_in_executor(hash_pool, _hash_file, path)
+
+            if rec is None:
+                unchanged = False
+            elif rec.hash_alg == HASH_ALG:
+                unchanged = rec.hash == file_hash
+            else:
+                # Row hashed with another algorithm (pre-BLAKE3 index): hash
+                # once more the old way to tell a touch from an edit. The
+                # refreshed row is stored under HASH_ALG, so this happens
+                # once per file.
+                unchanged = rec.hash_alg == "sha256" and rec.hash == await loop.run_in_executor(
+                    hash_pool, _hash_file, path, "sha256"
+                )
+        except OSError as ex:
+            # Deleted or locked since it was listed; the next event or scan
+            # picks it up again
+            logger.warning(f"[PhotoBrain] Failed hashing {path}: {ex}")
+            return None, False
+
+        # Same content under a new fingerprint (touched, copied back, legacy
+        # row without size) → refresh the index row, don't re-ingest
+        if unchanged:
+            refreshed = FileRecord(
+                path=spath,
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+                hash=file_hash,
+                hash_alg=HASH_ALG,
+                last_ingested_utc=rec.last_ingested_utc,
+            )
+            return refreshed, False
+
+        # Otherwise ingest
+        try:
+            async with upload_slots:
+                await ingest_file_to_imagestack(client, path)
+        except Exception as ex:
+            logger.error(f"[PhotoBrain] Failed ingest for {path}: {ex}")
+            return None, False
+
+        record = FileRecord(
+            path=spath,
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            hash=file_hash,
+            hash_alg=HASH_ALG,
+            last_ingested_utc=now_ts,
+        )
+        return record, True
+
+    limits = httpx.Limits(
+        max_connections=settings.max_concurrent_ingests * 2,
+        max_keepalive_connections=settings.max_concurrent_ingests,
+    )
+    async with httpx.AsyncClient(
+        base_url=settings.base_url.rstrip("/"),
+        timeout=300.0,
+        limits=limits,
+        http2=settings.http2,
+    ) as client:
+        tasks = []
+        for spath, stat in candidates:
+            rec = lookup(spath)
+
+            # Fast path: known file with same (mtime, size) fingerprint → skip
+            if rec and rec.mtime == stat.st_mtime and rec.size == stat.st_size:
+                continue
+
+            tasks.append(_process(client, spath, stat, rec))
+
+        records: list[FileRecord] = []
+        ingested_count = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    record, ingested = await next_done
+                except Exception as ex:
+                    # One bad file must not keep the batch's uploads unrecorded
+                    logger.error(f"[PhotoBrain] Ingest task failed: {ex}")
+                    continue
+                ingested_count += ingested
+                if record is not None:
+                    records.append(record)
+                    if len(records) >= _FLUSH_EVERY:
+                        store.upsert_many(records)
+                        records = []
+        finally:
+            # Also on cancellation (Ctrl-C), so finished uploads are kept
+            store.upsert_many(records)
+
+    return ingested_count
+
+
+def _run_ingest(
+    store: IndexStore,
+    candidates: Iterable[Candidate],
+    lookup: Callable[[str], Optional[FileRecord]],
+) -> int:
+    with ThreadPoolExecutor(max_workers=_HASH_WORKERS, thread_name_prefix="photobrain-hash") as pool:
+        return asyncio.run(_ingest_async(store, candidates, lookup, pool))
+
+
+def _iter_scan_candidates() -> Iterator[Candidate]:
+    for entry in _iter_candidate_files(settings.watch_dirs, settings.include_extensions):
+        try:
+            stat = entry.stat()
         except FileNotFoundError:
             continue
+        yield entry.path, stat
 
-        mtime = stat.st_mtime
-        rec = store.get(str(path))
 
-        # Fast path: known file with same mtime → skip
-        if rec and rec.mtime == mtime:
+def _in_skipped_dir(path: Path) -> bool:
+    for root in settings.watch_dirs:
+        try:
+            rel = path.relative_to(root)
+        except ValueError:
             continue
+        return not _SKIP_DIRS.isdisjoint(rel.parts[:-1])
+    return False
 
-        # New or modified file → compute hash
-        file_hash = _hash_file(path)
 
-        # If existing record with same hash & mtime, skip
-        if rec and rec.hash == file_hash and rec.mtime == mtime:
+def _iter_changed_candidates(paths: Iterable[str]) -> Iterator[Candidate]:
+    exts = _normalize_exts(settings.include_extensions)
+    for p in paths:
+        path = Path(p)
+        if not _has_ext(path.name, exts) or _in_skipped_dir(path):
             continue
-
-        # Otherwise ingest
         try:
-            data = ingest_file_to_imagestack(path)
-        except Exception as ex:
-            logger.error(f"[PhotoBrain] Failed ingest for {path}: {ex}")
+            stat = path.stat()
+        except OSError:
             continue
+        if stat_mod.S_ISREG(stat.st_mode):
+            yield p, stat
 
-        store.upsert(
-            FileRecord(
-                path=str(path),
-                mtime=mtime,
-                hash=file_hash,
-                last_ingested_utc=_now_utc_ts(),
-            )
-        )
-        ingested_count += 1
+
+def scan_once(store: IndexStore) -> int:
+    """
+    Run a single scan over all watched directories.
+
+    Hashing runs on a thread pool (one worker per core, up to 8) and uploads
+    are pipelined over one AsyncClient, bounded by
+    settings.max_concurrent_ingests.
+
+    Returns: number of files ingested this run.
+    """
+    logger.info("[PhotoBrain] Scan started")
+
+    # One bulk read instead of a SELECT per candidate file
+    known = store.load_all()
+    ingested_count = _run_ingest(store, _iter_scan_candidates(), known.get)
 
     logger.info(f"[PhotoBrain] Scan completed, ingested={ingested_count}")
     return ingested_count
 
 
+class _ChangeCollector(FileSystemEventHandler):
+    """
+    Collects file paths from watchdog events into a de-duplicated set.
+
+    Events arrive on the observer thread; the daemon thread waits for a
+    change, then drains the set once things have been quiet for the
+    debounce window.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._changed = threading.Event()
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._add(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._add(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._add(event.dest_path)
+
+    def _add(self, path: str) -> None:
+        with self._lock:
+            self._pending.add(path)
+        self._changed.set()
+
+    def wait(self, timeout: float) -> bool:
+        return self._changed.wait(timeout)
+
+    def drain(self, debounce_seconds: float) -> Set[str]:
+        # Hold off until no new events arrive for the debounce window, so
+        # files still being written settle before they are hashed
+        while True:
+            self._changed.clear()
+            if not self._changed.wait(debounce_seconds):
+                break
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        return pending
+
+
+def _safe_scan(store: IndexStore) -> None:
+    try:
+        scan_once(store)
+    except Exception as ex:
+        logger.error(f"[PhotoBrain] Scan failed: {ex}")
+
+
 def run_daemon() -> None:
     """
-    Main loop: periodically scan and ingest new images.
+    Main loop: scan once at startup, then ingest only the files reported by
+    filesystem events (inotify / ReadDirectoryChangesW / FSEvents).
+
+    A full rescan still runs every poll_interval_seconds as a safety net for
+    events the OS drops (network shares, watcher queue overflow).
     """
     logger.info("[PhotoBrain] Daemon starting up")
     logger.info(f"[PhotoBrain] Base URL: {settings.base_url}")
     logger.info(f"[PhotoBrain] Watch dirs: {', '.join(str(d) for d in settings.watch_dirs)}")
-    logger.info(f"[PhotoBrain] Poll interval: {settings.poll_interval_seconds}s")
+    logger.info(f"[PhotoBrain] Full rescan interval: {settings.poll_interval_seconds}s")
+    logger.info(f"[PhotoBrain] Max concurrent ingests: {settings.max_concurrent_ingests}")
 
     store = IndexStore(settings.index_db_path)
+    changes = _ChangeCollector()
+    observer = Observer()
+    for d in settings.watch_dirs:
+        if d.exists():
+            observer.schedule(changes, str(d), recursive=True)
+
+    # Start watching before the initial scan so nothing slips in between
+    observer.start()
 
     try:
+        _safe_scan(store)
+        last_scan = time.monotonic()
+
         while True:
+            remaining = settings.poll_interval_seconds - (time.monotonic() - last_scan)
+            if remaining <= 0:
+                _safe_scan(store)
+                last_scan = time.monotonic()
+                continue
+
+            if not changes.wait(remaining):
+                continue
+
+            paths = changes.drain(settings.debounce_seconds)
             try:
-                scan_once(store)
+                ingested = _run_ingest(store, _iter_changed_candidates(paths), store.get)
+                logger.info(f"[PhotoBrain] Processed {len(paths)} changed paths, ingested={ingested}")
             except Exception as ex:
-                logger.error(f"[PhotoBrain] Scan failed: {ex}")
-            time.sleep(settings.poll_interval_seconds)
+                logger.error(f"[PhotoBrain] Change batch failed: {ex}")
     except KeyboardInterrupt:
         logger.info("[PhotoBrain] Shutting down via KeyboardInterrupt")
     finally:
+        observer.stop()
+        observer.join()
         store.close()
 
 
@@ -0,0 +1,63 @@
+# photobrain/query_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    created_utc REAL NOT NULL,
+    body BLOB NOT NULL
+);
+"""
+
+DEFAULT_DB_PATH = Path.home() / ".photobrain" / "query_cache.db"
+
+
+def make_key(*parts: Any) -> str:
+    """Stable cache key for a (command, query, top_k, filters...) tuple."""
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class QueryCache:
+    """
+    Small on-disk cache of raw API response bodies, so re-running the same
+    CLI query within ttl_seconds skips the server (CLIP + Qdrant + LLM).
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, ttl_seconds: float = 300.0):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT created_utc, body FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if not row or time.time() - row[0] > self.ttl_seconds:
+            return None
+        return row[1]
+
+    def set(self, key: str, body: bytes) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created_utc, body) VALUES (?, ?, ?)",
+                (key, now, body),
+            )
+            # Keep the file small: drop anything already expired
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_utc < ?", (now - self.ttl_seconds,)
+            )
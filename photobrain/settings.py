@@ -24,12 +24,24 @@ class PhotoBrainSettings:
 
     - PHOTOBRAIN_BASE_URL           (default: http://localhost:8090)
     - PHOTOBRAIN_WATCH_DIRS         (PATHSEP-separated list; default: Pictures, Downloads/Screenshots)
-    - PHOTOBRAIN_POLL_INTERVAL      (seconds; default: 30)
+    - PHOTOBRAIN_POLL_INTERVAL      (seconds between full safety-net rescans; default: 3600)
+    - PHOTOBRAIN_DEBOUNCE           (seconds of quiet before a batch of file events is ingested; default: 1.0)
     - PHOTOBRAIN_INDEX_DB           (path to sqlite db; default: ~/.photobrain/index.db)
+    - PHOTOBRAIN_MAX_CONCURRENCY    (parallel uploads per scan; default: 8)
+    - PHOTOBRAIN_HTTP2              (1/true to multiplex uploads over HTTP/2; default: off)
     """
 
     base_url: str = field(default_factory=lambda: os.getenv("PHOTOBRAIN_BASE_URL", "http://localhost:8090"))
-    poll_interval_seconds: int = field(default_factory=lambda: int(os.getenv("PHOTOBRAIN_POLL_INTERVAL", "30")))
+    poll_interval_seconds: int = field(default_factory=lambda: int(os.getenv("PHOTOBRAIN_POLL_INTERVAL", "3600")))
+    debounce_seconds: float = field(default_factory=lambda: float(os.getenv("PHOTOBRAIN_DEBOUNCE", "1.0")))
+    max_concurrent_ingests: int = field(
+        default_factory=lambda: int(os.getenv("PHOTOBRAIN_MAX_CONCURRENCY", "8"))
+    )
+    # Only takes effect against an https:// endpoint that negotiates h2 via
+    # ALPN (e.g. a TLS reverse proxy); plain-HTTP uvicorn stays on HTTP/1.1
+    http2: bool = field(
+        default_factory=lambda: os.getenv("PHOTOBRAIN_HTTP2", "").lower() in ("1", "true", "yes")
+    )
     index_db_path: Path = field(
         default_factory=lambda: Path(os.getenv("PHOTOBRAIN_INDEX_DB", str(Path.home() / ".photobrain" / "index.db")))
     )
@@ -47,12 +59,21 @@ class PhotoBrainSettings:
             str(Path.home() / "Downloads"),
         ]
         watch_dir_strs = _env_list("PHOTOBRAIN_WATCH_DIRS", default_dirs)
-        watch_dirs = [Path(d).expanduser() for d in watch_dir_strs]
+        watch_dirs = [Path(d).expanduser().resolve() for d in watch_dir_strs]
 
         cfg = cls()
-        cfg.watch_dirs = watch_dirs
+        cfg.watch_dirs = _drop_nested(watch_dirs)
         return cfg
 
 
+def _drop_nested(dirs: List[Path]) -> List[Path]:
+    """
+    Dedupe roots and drop any root already covered by an ancestor root, so
+    e.g. Pictures/Screenshots is not walked a second time under Pictures.
+    """
+    unique = list(dict.fromkeys(dirs))
+    return [d for d in unique if not any(d != o and d.is_relative_to(o) for o in unique)]
+
+
 settings = PhotoBrainSettings.load()
 
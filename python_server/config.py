@@ -12,13 +12,19 @@ class Settings(BaseSettings):
     vision_model: str = "llama3.2-vision:11b"  # ✅ Updated
     ocr_model: str = "moondream"               # ✅ Optional dedicated OCR
     storage_dir: str = _DEFAULT_STORAGE
+    persist_vision_inputs: bool = False  # Keep /vision/describe uploads in storage (preprocess always saves)
     
     # RAG / Vector Store settings
     qdrant_url: str = "http://localhost:6333"
     qdrant_api_key: str = ""  # Empty for local instance
+    qdrant_prefer_grpc: bool = True  # Persistent multiplexed gRPC channel instead of REST
+    qdrant_grpc_port: int = 6334
+    qdrant_timeout: int = 30  # Seconds, per request
     clip_model: str = "ViT-L-14"
     clip_pretrained: str = "openai"
     embedding_dim: int = 768  # ViT-L-14 dimension
+    clip_compile: bool = False  # torch.compile the encoders (RAG: CUDA + Triton; PhotoBrain: any device)
+    cpu_threads: int = 0  # torch/OpenCV/BLAS threads each; 0 = cpu_count // 4
     
     # PhotoBrain QA settings
     photobrain_qa_model: str = "phi4:14b"  # Ollama model for RAG Q&A
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List
 
@@ -14,8 +14,14 @@ class WatcherSettings:
     api_base: str
     processed_subdir: str = "processed"
     failed_subdir: str = "failed"
-    debounce_seconds: float = 1.0
+    debounce_seconds: float = 1.0  # quiet time after the last write before a file is ingested
+    ingest_concurrency: int = 4  # files hashed + uploaded in parallel
     image_extensions: tuple = (".jpg", ".jpeg", ".png", ".webp", ".heic", ".tif", ".tiff")
+    # SQLite record of ingested hashes, so restarts don't re-send old files
+    seen_db_path: Path = field(default_factory=lambda: Path.home() / ".photobrain" / "watcher_seen.db")
+    # Same opt-in as the ingestor: only useful against an https endpoint
+    # that negotiates h2; plain-HTTP uvicorn speaks HTTP/1.1
+    http2: bool = False
 
 
 def _default_watch_dirs() -> List[Path]:
@@ -35,9 +41,16 @@ def _default_watch_dirs() -> List[Path]:
 def load_watcher_settings() -> WatcherSettings:
     watch_dirs = _default_watch_dirs()
     api_base = os.getenv("PHOTOBRAIN_API_BASE", "http://localhost:8090")
+    seen_db = os.getenv("PHOTOBRAIN_WATCHER_DB")
 
-    return WatcherSettings(
+    settings = WatcherSettings(
         watch_dirs=watch_dirs,
         api_base=api_base.rstrip("/"),
+        debounce_seconds=float(os.getenv("PHOTOBRAIN_DEBOUNCE", "1.0")),
+        ingest_concurrency=int(os.getenv("PHOTOBRAIN_WATCHER_CONCURRENCY", "4")),
+        http2=os.getenv("PHOTOBRAIN_HTTP2", "").lower() in ("1", "true", "yes"),
     )
+    if seen_db:
+        settings.seen_db_path = Path(seen_db).expanduser().resolve()
+    return settings
 
@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+
+from .utils.cpu_threads import configure_cpu_threads
+
+# Before the routers pull in torch/cv2/numpy, so the BLAS/OpenMP caps apply
+configure_cpu_threads()
+
 from .routers import health, vision, ocr, debug_preprocess, rag_image, photobrain, photobrain_query
+from .services import vision_service
+from .utils.image_io import thumbs_dir
 from .utils.logging_config import configure_logging
 
 configure_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models and connect before serving, not on the first request
+    await rag_image.init_rag_state(app)
+    yield
+    await photobrain.shutdown_photobrain()
+    await photobrain_query.shutdown_photobrain_query()
+    await vision_service.aclose_client()
+
+
 app = FastAPI(
     title="ImageStack / PhotoBrain",
     description="Local multimodal/vision server with ImageRAG and PhotoBrain auto-ingestion + intelligent search",
     version="0.4.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -26,3 +49,5 @@ app.include_router(rag_image.router, prefix="/rag", tags=["RAG"])
 app.include_router(photobrain.router, prefix="/photobrain", tags=["PhotoBrain"])
 app.include_router(photobrain_query.router, prefix="/photobrain", tags=["PhotoBrain-Query"])
 
+# RAG thumbnails live on disk; payloads only carry their URL
+app.mount("/thumbs", StaticFiles(directory=thumbs_dir()), name="thumbs")
@@ -13,7 +13,8 @@ class PhotoBrainIngestResponse(BaseModel):
     filename: str
     path_raw: str
     path_processed: Optional[str] = None
-    hash: str = Field(..., description="SHA-256 digest of the raw image bytes")
+    hash: str = Field(..., description="Content digest of the raw image bytes")
+    hash_alg: str = Field("sha256", description="Digest algorithm: blake3 or sha256")
     ocr_text: Optional[str] = None
     ocr_confidence: Optional[float] = None
     embedded: bool = Field(..., description="Whether an embedding was stored")
@@ -1,11 +1,21 @@
 # python_server/rag/image_embedder.py
 
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 import numpy as np
 from PIL import Image
 from loguru import logger
 import torch
+import torch.nn.functional as F
 import torchvision.transforms as T
+from torchvision.io import ImageReadMode, decode_image, decode_jpeg, read_file
+from torchvision.transforms import v2
 import open_clip
 
 
@@ -14,7 +24,9 @@ class ImageEmbedder:
     Embeds images into a vector space using CLIP.
     """
 
-    def __init__(self, model_name="ViT-L-14", pretrained="openai", device=None):
+    TEXT_CACHE_SIZE = 1024
+
+    def __init__(self, model_name="ViT-L-14", pretrained="openai", device=None, use_compile=False):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
 
         logger.info(f"Loading CLIP model {model_name} ({pretrained}) on {self.device}")
@@ -23,31 +35,212 @@ class ImageEmbedder:
         )
         self.model.eval().to(self.device)
 
+        # Half precision on GPU: BF16 where supported (Ampere+), else FP16.
+        # Embeddings are converted back to FP32 before they reach Qdrant.
+        self._on_cuda = str(self.device).startswith("cuda")
+        if self._on_cuda:
+            self.dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            self.model = self.model.to(self.dtype)
+        else:
+            self.dtype = torch.float32
+
         # Get tokenizer for text embeddings
         self.tokenizer = open_clip.get_tokenizer(model_name)
 
         # CLIP requires transforms as preproc
         self.transform = self.preprocess
 
-    def embed_image(self, path: str) -> np.ndarray:
-        img = Image.open(path).convert("RGB")
-        tensor = self.transform(img).unsqueeze(0).to(self.device)
+        # On CUDA, decode JPEGs with nvJPEG and resize/crop/normalize on the
+        # GPU; the CPU path keeps open_clip's PIL transform
+        self._gpu_transform = self._build_gpu_transform() if self._on_cuda else None
 
-        with torch.no_grad():
-            embedding = self.model.encode_image(tensor)
+        self._prep_pool = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="clip-prep"
+        )
 
-        embedding = embedding.cpu().float().numpy()[0]
-        embedding /= np.linalg.norm(embedding)  # normalize
-        return embedding
+        # Repeated text queries (retries, typeahead) skip the text encoder
+        self._text_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._text_cache_lock = threading.Lock()
+
+        self._encode_image = self.model.encode_image
+        self._encode_text = self.model.encode_text
+        # (graph, static input, static output) for single-image batches
+        self._image_graph = None
+        self._image_graph_lock = threading.Lock()
+        if use_compile and self._on_cuda:
+            self._compile_encoders()
+        elif self._on_cuda:
+            # reduce-overhead compile already replays CUDA graphs itself
+            self._capture_image_graph()
+
+    def _image_hw(self) -> tuple[int, int]:
+        size = self.model.visual.image_size
+        return tuple(size) if isinstance(size, (tuple, list)) else (size, size)
+
+    def _capture_image_graph(self, batch_size: int = 1):
+        """
+        Record one encode_image forward as a CUDA graph over static buffers.
+        Replaying it skips the per-kernel launch overhead of the ViT; other
+        batch shapes keep using the eager encoder.
+        """
+        try:
+            h, w = self._image_hw()
+            static_in = torch.zeros(batch_size, 3, h, w, device=self.device, dtype=self.dtype)
+
+            # Warm up on a side stream so lazy init isn't captured
+            side = torch.cuda.Stream()
+            side.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(side), self._inference():
+                for _ in range(3):
+                    self.model.encode_image(static_in)
+            torch.cuda.current_stream().wait_stream(side)
+
+            graph = torch.cuda.CUDAGraph()
+            with self._inference(), torch.cuda.graph(graph):
+                static_out = self.model.encode_image(static_in)
+            self._image_graph = (graph, static_in, static_out)
+            logger.info(f"Captured CUDA graph for CLIP image encoder (batch={batch_size})")
+        except Exception as ex:
+            logger.warning(f"CUDA graph capture failed, using eager image encoder: {ex}")
+            self._image_graph = None
+
+    def _compile_encoders(self):
+        """
+        Specialize both encoders with torch.compile (CUDA graphs) and warm them
+        up, so the first real request doesn't pay the compile cost. Each new
+        batch size triggers one more compile. Falls back to eager if the
+        toolchain (Triton) is unavailable.
+        """
+        logger.info("Compiling CLIP encoders with torch.compile (reduce-overhead)")
+        try:
+            self._encode_image = torch.compile(
+                self.model.encode_image, mode="reduce-overhead", dynamic=False
+            )
+            self._encode_text = torch.compile(
+                self.model.encode_text, mode="reduce-overhead", dynamic=False
+            )
+            h, w = self._image_hw()
+            dummy = torch.zeros(1, 3, h, w, device=self.device, dtype=self.dtype)
+            tokens = self.tokenizer([""]).to(self.device)
+            with self._inference():
+                self._encode_image(dummy)
+                self._encode_text(tokens)
+        except Exception as ex:
+            logger.warning(f"torch.compile unavailable, using eager CLIP encoders: {ex}")
+            self._encode_image = self.model.encode_image
+            self._encode_text = self.model.encode_text
+            self._capture_image_graph()
+
+    @contextmanager
+    def _inference(self):
+        # Autocast keeps precision-sensitive ops (layer norm, softmax) in FP32
+        # while the matmuls run on half-precision tensor cores. Its weight-cast
+        # cache stays off: it must not leak into CUDA graphs, and the weights
+        # are already in self.dtype anyway.
+        with torch.inference_mode(), torch.autocast(
+            device_type="cuda", dtype=self.dtype, enabled=self._on_cuda, cache_enabled=False
+        ):
+            yield
+
+    def _build_gpu_transform(self) -> v2.Compose:
+        # Same steps as open_clip's eval preprocess, on uint8 CHW tensors
+        h, w = self._image_hw()
+        mean = getattr(self.model.visual, "image_mean", None) or open_clip.OPENAI_DATASET_MEAN
+        std = getattr(self.model.visual, "image_std", None) or open_clip.OPENAI_DATASET_STD
+        return v2.Compose([
+            v2.Resize(min(h, w), interpolation=v2.InterpolationMode.BICUBIC, antialias=True),
+            v2.CenterCrop((h, w)),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(mean=list(mean), std=list(std)),
+        ])
+
+    def _load_on_device(self, image: str | Image.Image) -> torch.Tensor:
+        """RGB uint8 CHW tensor on self.device."""
+        if not isinstance(image, Image.Image):
+            data = read_file(str(image))
+            if str(image).lower().endswith((".jpg", ".jpeg")):
+                try:
+                    return decode_jpeg(data, mode=ImageReadMode.RGB, device=self.device)
+                except RuntimeError:
+                    pass  # e.g. CMYK or lossless JPEG nvJPEG can't handle
+            try:
+                return self._upload(decode_image(data, mode=ImageReadMode.RGB))
+            except RuntimeError:
+                with Image.open(image) as img:
+                    image = img.convert("RGB")
+        arr = np.array(image if image.mode == "RGB" else image.convert("RGB"))
+        return self._upload(torch.from_numpy(arr).permute(2, 0, 1))
+
+    def _upload(self, cpu_tensor: torch.Tensor) -> torch.Tensor:
+        # Only a copy from pinned memory is truly async; from pageable
+        # memory non_blocking=True still stalls the host
+        return cpu_tensor.pin_memory().to(self.device, non_blocking=True)
+
+    def _to_tensor(self, image: str | Image.Image) -> torch.Tensor:
+        if self._gpu_transform is not None:
+            return self._gpu_transform(self._load_on_device(image))
+
+        # Already-decoded images skip the file read and JPEG decode
+        if isinstance(image, Image.Image):
+            return self.transform(image if image.mode == "RGB" else image.convert("RGB"))
+        with Image.open(image) as img:
+            return self.transform(img.convert("RGB"))
+
+    def embed_images(self, images: list[str | Image.Image]) -> np.ndarray:
+        """
+        Embed a batch of images (paths or decoded PIL images) in one forward
+        pass. Returns (N, D), L2-normalized.
+        """
+        if len(images) > 1:
+            # Decode/resize release the GIL, so batch items prepare in parallel
+            imgs = list(self._prep_pool.map(self._to_tensor, images))
+        else:
+            imgs = [self._to_tensor(image) for image in images]
+        tensors = torch.stack(imgs).to(self.device, dtype=self.dtype, non_blocking=True)
+
+        graph = self._image_graph
+        if graph is not None and tensors.shape == graph[1].shape:
+            g, static_in, static_out = graph
+            # Static buffers are shared, so one replay at a time
+            with self._image_graph_lock, self._inference():
+                static_in.copy_(tensors)
+                g.replay()
+                embeddings = F.normalize(static_out.float(), dim=-1)
+        else:
+            with self._inference():
+                embeddings = self._encode_image(tensors)
+                # Normalize on-device, then copy the whole batch back once
+                embeddings = F.normalize(embeddings.float(), dim=-1)
+
+        return embeddings.cpu().numpy()
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch of strings in one forward pass. Returns (N, D), L2-normalized."""
+        tokens = self.tokenizer(texts).to(self.device, non_blocking=True)
+
+        with self._inference():
+            embeddings = self._encode_text(tokens)
+            embeddings = F.normalize(embeddings.float(), dim=-1)
+
+        return embeddings.cpu().numpy()
+
+    def embed_image(self, image: str | Image.Image) -> np.ndarray:
+        return self.embed_images([image])[0]
 
     def embed_text(self, text: str) -> np.ndarray:
-        """Embed text using CLIP text encoder."""
-        tokens = self.tokenizer([text]).to(self.device)
+        """Embed text using CLIP text encoder (LRU-cached per string)."""
+        with self._text_cache_lock:
+            cached = self._text_cache.get(text)
+            if cached is not None:
+                self._text_cache.move_to_end(text)
+                return cached
 
-        with torch.no_grad():
-            embedding = self.model.encode_text(tokens)
+        embedding = self.embed_texts([text])[0]
+        # Shared between callers, so make it read-only
+        embedding.setflags(write=False)
 
-        embedding = embedding.cpu().float().numpy()[0]
-        embedding /= np.linalg.norm(embedding)  # normalize
+        with self._text_cache_lock:
+            self._text_cache[text] = embedding
+            if len(self._text_cache) > self.TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
         return embedding
-
@@ -1,19 +1,56 @@
 # python_server/rag/image_ingest_service.py
 
+import asyncio
 import uuid
-import hashlib
-import base64
+import threading
+from collections import defaultdict
 from pathlib import Path
-from io import BytesIO
 from datetime import datetime
 from loguru import logger
-from PIL import Image
+import numpy as np
+from PIL import Image, ImageOps
 
-from ..utils.image_io import save_temp_image
+from ..utils.batching import Coalescer
+from ..utils.hashing import HASH_ALG
+from ..utils.image_io import save_content_addressed, thumbs_dir
 from .image_embedder import ImageEmbedder
 from .image_store import ImageVectorStore
 
 
+# One EasyOCR reader per process, shared by every ingest service/request
+_ocr_reader = None
+_ocr_lock = threading.Lock()
+
+# readtext_batched resizes a whole batch to one size; images are grouped by
+# dimensions rounded to this step so each group barely gets resampled
+_OCR_BUCKET_PX = 320
+
+
+def get_ocr_reader():
+    """Lazy-load the shared OCR reader (thread-safe)."""
+    global _ocr_reader
+    with _ocr_lock:
+        if _ocr_reader is None:
+            import easyocr
+            logger.info("Initializing EasyOCR reader for RAG ingestion...")
+            _ocr_reader = easyocr.Reader(["en"], gpu=True)
+    return _ocr_reader
+
+
+def warmup_ocr_reader() -> None:
+    """Load OCR weights and init CUDA now, instead of on the first ingest."""
+    get_ocr_reader().readtext(np.zeros((64, 64, 3), dtype=np.uint8))
+    logger.info("[ImageRAG] EasyOCR reader warmed up")
+
+
+def _ocr_bucket(size: tuple[int, int]) -> tuple[int, int]:
+    w, h = size
+    return (
+        max(1, round(w / _OCR_BUCKET_PX)) * _OCR_BUCKET_PX,
+        max(1, round(h / _OCR_BUCKET_PX)) * _OCR_BUCKET_PX,
+    )
+
+
 class ImageIngestService:
     """
     Ingest images into the RAG system:
@@ -26,23 +63,61 @@ class ImageIngestService:
     def __init__(self, store: ImageVectorStore, embedder: ImageEmbedder):
         self.store = store
         self.embedder = embedder
-        self._ocr_reader = None
+        # Concurrent add_image calls share one Qdrant upsert
+        self._batcher = Coalescer(self._upsert_batch, max_batch=32)
+
+    async def _upsert_batch(self, points: list) -> list:
+        await asyncio.to_thread(self.store.add_images, points)
+        return [None] * len(points)
 
     def _get_ocr_reader(self):
-        """Lazy-load OCR reader to avoid startup penalty."""
-        if self._ocr_reader is None:
-            import easyocr
-            logger.info("Initializing EasyOCR reader for RAG ingestion...")
-            self._ocr_reader = easyocr.Reader(["en"], gpu=True)
-        return self._ocr_reader
+        return get_ocr_reader()
 
-    def _make_thumb(self, path: str, width=256) -> str:
-        """Generate thumbnail base64."""
-        img = Image.open(path).convert("RGB")
-        img.thumbnail((width, width))
-        buffered = BytesIO()
-        img.save(buffered, format="JPEG", quality=85)
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    @staticmethod
+    def _decode(path: str) -> Image.Image:
+        with Image.open(path) as img:
+            return img.convert("RGB")
+
+    def _extract_ocr_text(self, img: Image.Image) -> str:
+        """Run OCR; failures are logged and yield empty text."""
+        try:
+            reader = self._get_ocr_reader()
+            # RGB array, same layout easyocr's own loader produces
+            ocr = reader.readtext(np.asarray(img), detail=0)
+            logger.info(f"[ImageRAG] OCR extracted {len(ocr)} segments")
+            return "\n".join(ocr)
+        except Exception as ex:
+            logger.warning(f"[ImageRAG] OCR failed: {ex}")
+            return ""
+
+    def _extract_ocr_texts(self, imgs: list[Image.Image]) -> list[str]:
+        """OCR many images with readtext_batched, one call per size bucket."""
+        texts = [""] * len(imgs)
+        buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i, img in enumerate(imgs):
+            buckets[_ocr_bucket(img.size)].append(i)
+
+        for (width, height), idxs in buckets.items():
+            try:
+                reader = self._get_ocr_reader()
+                results = reader.readtext_batched(
+                    [np.asarray(imgs[i]) for i in idxs],
+                    n_width=width,
+                    n_height=height,
+                    detail=0,
+                )
+                for i, ocr in zip(idxs, results):
+                    texts[i] = "\n".join(ocr)
+            except Exception as ex:
+                logger.warning(f"[ImageRAG] Batched OCR failed for {len(idxs)} images: {ex}")
+        return texts
+
+    def _make_thumb(self, img: Image.Image, image_id: str, width=256) -> str:
+        """Write a JPEG thumbnail to the thumbs dir; returns its URL path."""
+        # contain() returns a new image, leaving the shared decode untouched
+        thumb = img if max(img.size) <= width else ImageOps.contain(img, (width, width))
+        thumb.save(thumbs_dir() / f"{image_id}.jpg", format="JPEG", quality=85)
+        return f"/thumbs/{image_id}.jpg"
 
     async def ingest(self, file, extract_ocr: bool = True, tags: list = None):
         """
@@ -56,54 +131,136 @@ class ImageIngestService:
         Returns:
             dict with id, hash, ocr_text, tags
         """
-        # Save image
-        file_path = await save_temp_image(file)
+        # Save image under its content hash (identical bytes share one file)
+        file_path, digest = await save_content_addressed(file)
         img_path = Path(file_path)
+        filename = file.filename or img_path.name
 
-        # Compute hash
-        digest = hashlib.sha256(img_path.read_bytes()).hexdigest()
+        # Same bytes already ingested → skip OCR and CLIP entirely
+        hit = await asyncio.to_thread(self.store.find_by_hash, digest)
+        if hit is not None:
+            return self._duplicate_result(hit, digest, filename)
 
-        # OCR extract (optional)
-        ocr_text = ""
+        image_id = uuid.uuid4().hex
+
+        # Decode once; OCR, CLIP and the thumbnail all read this image
+        loop = asyncio.get_running_loop()
+        img = await loop.run_in_executor(None, self._decode, str(img_path))
+
+        # OCR, CLIP embedding and thumbnail are independent: run them
+        # concurrently on the default executor so CPU work overlaps the GPU
         if extract_ocr:
-            try:
-                reader = self._get_ocr_reader()
-                ocr = reader.readtext(str(img_path), detail=0)
-                ocr_text = "\n".join(ocr)
-                logger.info(f"[ImageRAG] OCR extracted {len(ocr)} segments")
-            except Exception as ex:
-                logger.warning(f"[ImageRAG] OCR failed: {ex}")
-                ocr_text = ""
+            ocr_job = loop.run_in_executor(None, self._extract_ocr_text, img)
+        else:
+            ocr_job = asyncio.sleep(0, result="")
 
-        # Embed
-        logger.info(f"[ImageRAG] Generating embedding for {img_path.name}")
-        embedding = self.embedder.embed_image(str(img_path))
+        logger.info(f"[ImageRAG] Generating embedding for {filename}")
+        ocr_text, embedding, thumb_url = await asyncio.gather(
+            ocr_job,
+            loop.run_in_executor(None, self.embedder.embed_image, img),
+            loop.run_in_executor(None, self._make_thumb, img, image_id),
+        )
 
-        # Generate thumbnail
-        thumb_b64 = self._make_thumb(str(img_path))
+        meta = self._build_meta(img_path, filename, digest, ocr_text, tags, thumb_url)
 
-        # Build metadata
-        image_id = uuid.uuid4().hex
-        meta = {
-            "filename": img_path.name,
+        # Store in Qdrant
+        await self._batcher.submit((image_id, embedding, meta))
+
+        logger.info(f"[ImageRAG] Ingested {img_path} → id={image_id}")
+
+        return self._result(image_id, meta)
+
+    async def ingest_many(self, files, extract_ocr: bool = True, tags: list = None):
+        """
+        Ingest several images at once: one batched OCR call per size bucket,
+        one CLIP forward for the whole batch and one Qdrant upsert.
+
+        Returns:
+            list of dicts (same shape as ingest), in input order
+        """
+        results: list = [None] * len(files)
+        todo: list[tuple[int, Path, str, str]] = []
+        for i, file in enumerate(files):
+            file_path, digest = await save_content_addressed(file)
+            img_path = Path(file_path)
+            filename = file.filename or img_path.name
+            hit = await asyncio.to_thread(self.store.find_by_hash, digest)
+            if hit is not None:
+                results[i] = self._duplicate_result(hit, digest, filename)
+            else:
+                todo.append((i, img_path, filename, digest))
+
+        if not todo:
+            return results
+
+        loop = asyncio.get_running_loop()
+        imgs = await loop.run_in_executor(
+            None, lambda: [self._decode(str(path)) for _, path, _, _ in todo]
+        )
+        image_ids = [uuid.uuid4().hex for _ in todo]
+
+        if extract_ocr:
+            ocr_job = loop.run_in_executor(None, self._extract_ocr_texts, imgs)
+        else:
+            ocr_job = asyncio.sleep(0, result=[""] * len(todo))
+
+        logger.info(f"[ImageRAG] Generating embeddings for {len(todo)} images")
+        ocr_texts, embeddings, thumb_urls = await asyncio.gather(
+            ocr_job,
+            loop.run_in_executor(None, self.embedder.embed_images, imgs),
+            loop.run_in_executor(
+                None, lambda: [self._make_thumb(img, iid) for img, iid in zip(imgs, image_ids)]
+            ),
+        )
+
+        points = []
+        for (i, img_path, filename, digest), image_id, ocr_text, embedding, thumb_url in zip(
+            todo, image_ids, ocr_texts, embeddings, thumb_urls
+        ):
+            meta = self._build_meta(img_path, filename, digest, ocr_text, tags, thumb_url)
+            points.append((image_id, embedding, meta))
+            results[i] = self._result(image_id, meta)
+
+        await asyncio.to_thread(self.store.add_images, points)
+        logger.info(f"[ImageRAG] Ingested {len(points)} images ({len(files) - len(points)} duplicates)")
+        return results
+
+    @staticmethod
+    def _build_meta(
+        img_path: Path, filename: str, digest: str, ocr_text: str, tags, thumb_url: str
+    ) -> dict:
+        return {
+            "filename": filename,
             "hash": digest,
+            "hash_alg": HASH_ALG,
             "ocr_text": ocr_text,
             "tags": tags or [],
             "created": datetime.utcnow().isoformat(),
-            "thumb": thumb_b64,
+            "thumb_url": thumb_url,
             "path": str(img_path),
         }
 
-        # Store in Qdrant
-        self.store.add_image(image_id=image_id, embedding=embedding, meta=meta)
-
-        logger.info(f"[ImageRAG] Ingested {img_path} → id={image_id}")
-
+    @staticmethod
+    def _result(image_id: str, meta: dict) -> dict:
         return {
             "id": image_id,
+            "hash": meta["hash"],
+            "ocr_text": meta["ocr_text"],
+            "tags": meta["tags"],
+            "filename": meta["filename"],
+        }
+
+    @staticmethod
+    def _duplicate_result(hit, digest: str, filename: str) -> dict:
+        # The stored file is shared with the existing point; keep it
+        payload = hit.payload or {}
+        logger.info(f"[ImageRAG] Duplicate of id={hit.id} (hash={digest[:12]}), skipping ingest")
+        return {
+            # Qdrant echoes UUIDs hyphenated; match the hex ids we hand out
+            "id": str(hit.id).replace("-", ""),
             "hash": digest,
-            "ocr_text": ocr_text,
-            "tags": tags or [],
-            "filename": img_path.name,
+            "ocr_text": payload.get("ocr_text", ""),
+            "tags": payload.get("tags", []),
+            "filename": payload.get("filename", filename),
         }
 
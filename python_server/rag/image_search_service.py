@@ -1,13 +1,22 @@
 # python_server/rag/image_search_service.py
 
+import asyncio
+from typing import Sequence
+
 import numpy as np
 from loguru import logger
 
+from ..utils.batching import EmbedBatcher
 from ..utils.image_io import save_temp_image
 from .image_embedder import ImageEmbedder
 from .image_store import ImageVectorStore
 
 
+def _format_results(results) -> list[dict]:
+    # ScoredPoint.score is already a float
+    return [{"id": r.id, "score": r.score, "metadata": r.payload} for r in results]
+
+
 class ImageSearchService:
     """
     Search images by:
@@ -18,14 +27,23 @@ class ImageSearchService:
     def __init__(self, store: ImageVectorStore, embedder: ImageEmbedder):
         self.store = store
         self.embedder = embedder
+        self._image_batcher = EmbedBatcher(embedder.embed_images)
+        self._text_batcher = EmbedBatcher(self._embed_text_batch)
+
+    def _embed_text_batch(self, texts: list[str]) -> Sequence[np.ndarray]:
+        # A lone query goes through embed_text so it still hits the LRU cache
+        if len(texts) == 1:
+            return [self.embedder.embed_text(texts[0])]
+        return self.embedder.embed_texts(texts)
 
-    async def search_by_image(self, file, limit=5):
+    async def search_by_image(self, file, limit=5, ef=None):
         """
         Search for visually similar images.
         
         Args:
             file: UploadFile containing query image
             limit: Number of results to return
+            ef: Optional HNSW search beam override (default scales with limit)
             
         Returns:
             List of search results with scores and metadata
@@ -33,28 +51,22 @@ class ImageSearchService:
         saved = await save_temp_image(file)
         logger.info(f"[ImageRAG] Searching by image: {saved}")
         
-        vec = self.embedder.embed_image(saved)
-        results = self.store.search_by_vector(vec, limit)
+        vec = await self._image_batcher.embed(saved)
+        results = await asyncio.to_thread(self.store.search_by_vector, vec, limit, ef=ef)
         
-        # Format results
-        formatted = []
-        for result in results:
-            formatted.append({
-                "id": result.id,
-                "score": float(result.score),
-                "metadata": result.payload,
-            })
+        formatted = _format_results(results)
         
         logger.info(f"[ImageRAG] Found {len(formatted)} similar images")
         return formatted
 
-    async def search_by_text(self, query: str, limit=5):
+    async def search_by_text(self, query: str, limit=5, ef=None):
         """
         Search for images matching a text description.
         
         Args:
             query: Text query (e.g. "sunset over mountains")
             limit: Number of results to return
+            ef: Optional HNSW search beam override (default scales with limit)
             
         Returns:
             List of search results with scores and metadata
@@ -62,17 +74,10 @@ class ImageSearchService:
         logger.info(f"[ImageRAG] Searching by text: '{query}'")
         
         # CLIP can embed text too
-        text_vec = self.embedder.embed_text(query)
-        results = self.store.search_by_vector(text_vec, limit)
+        text_vec = await self._text_batcher.embed(query)
+        results = await asyncio.to_thread(self.store.search_by_vector, text_vec, limit, ef=ef)
         
-        # Format results
-        formatted = []
-        for result in results:
-            formatted.append({
-                "id": result.id,
-                "score": float(result.score),
-                "metadata": result.payload,
-            })
+        formatted = _format_results(results)
         
         logger.info(f"[ImageRAG] Found {len(formatted)} matching images")
         return formatted
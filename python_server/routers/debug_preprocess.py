@@ -1,13 +1,15 @@
 # python_server/routers/debug_preprocess.py
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from tempfile import TemporaryDirectory
 from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
 import zipfile
 import json
 from loguru import logger
 
+from ..utils.cpu_threads import run_cpu_bound
 from ..utils.image_io import save_temp_image
 from ..services.image_preprocess import (
     debug_preprocess_ocr_pipeline,
@@ -17,6 +19,53 @@ from ..services.image_preprocess import (
 router = APIRouter()
 
 
+class _ChunkSink:
+    """Write-only, unseekable file object; zipfile then emits data descriptors."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        yield from chunks
+
+
+def _iter_zip(
+    files: List[Tuple[Path, str]],
+    texts: List[Tuple[str, str]],
+    cleanup: Callable[[], None],
+) -> Iterator[bytes]:
+    """Yield the ZIP as it is built, file by file, then run cleanup."""
+    sink = _ChunkSink()
+    try:
+        # PNG/JPEG stages are already compressed; deflate would only burn CPU
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+            for src, arcname in files:
+                zf.write(src, arcname)
+                yield from sink.drain()
+            for arcname, text in texts:
+                zf.writestr(arcname, text)
+                yield from sink.drain()
+        yield from sink.drain()
+    finally:
+        cleanup()
+
+
+def _stage_files(meta: dict, tmp_root: Path) -> List[Tuple[Path, str]]:
+    rels = [stage["file"] for stage in meta.get("stages", [])]
+    final = meta.get("final", {}).get("file")
+    if final:
+        rels.append(final)
+    return [(tmp_root / rel, rel) for rel in rels if (tmp_root / rel).exists()]
+
+
 @router.post("/preprocess")
 async def debug_preprocess(file: UploadFile = File(...)):
     """
@@ -36,8 +85,11 @@ async def debug_preprocess(file: UploadFile = File(...)):
     original_ext = Path(original_path).suffix or ".png"
     logger.info(f"[debug] Original image saved: {original_path}")
 
-    with TemporaryDirectory() as tmpdir:
-        tmp_root = Path(tmpdir)
+    # The pipelines write their stage images here; it is removed once the
+    # ZIP has been streamed (or the client disconnects)
+    tmpdir = TemporaryDirectory()
+    try:
+        tmp_root = Path(tmpdir.name)
 
         # Subdirs inside the zip
         ocr_dir = tmp_root / "ocr"
@@ -46,88 +98,58 @@ async def debug_preprocess(file: UploadFile = File(...)):
         vision_dir.mkdir(parents=True, exist_ok=True)
 
         # Run debug pipelines (write intermediates into ocr/ and vision/)
-        ocr_final_rel, ocr_meta = debug_preprocess_ocr_pipeline(
+        ocr_final_rel, ocr_meta = await run_cpu_bound(
+            debug_preprocess_ocr_pipeline,
             original_path,
             out_dir=ocr_dir,
         )
 
-        vision_final_rel, vision_meta = debug_preprocess_vision_pipeline(
+        vision_final_rel, vision_meta = await run_cpu_bound(
+            debug_preprocess_vision_pipeline,
             original_path,
             out_dir=vision_dir,
         )
+    except Exception:
+        tmpdir.cleanup()
+        raise
 
-        # Build metadata.json contents
-        metadata = {
-            "original": {
-                "file": f"original{original_ext}",
-            },
-            "ocr": ocr_meta,
-            "vision": vision_meta,
-        }
-
-        # Create viewer.html
-        viewer_html_path = tmp_root / "viewer.html"
-        _write_viewer_html(
-            viewer_html_path,
-            original_name=f"original{original_ext}",
-            ocr_meta=ocr_meta,
-            vision_meta=vision_meta,
-        )
+    # Build metadata.json contents
+    metadata = {
+        "original": {
+            "file": f"original{original_ext}",
+        },
+        "ocr": ocr_meta,
+        "vision": vision_meta,
+    }
 
-        # Write metadata.json
-        metadata_path = tmp_root / "metadata.json"
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2)
-
-        # Build ZIP
-        zip_path = tmp_root / "preprocess_debug.zip"
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            # Original
-            zf.write(original_path, f"original{original_ext}")
-
-            # OCR pipeline files
-            for stage in ocr_meta.get("stages", []):
-                rel = stage["file"]  # e.g. "ocr/ocr_stage_01_gray.png"
-                src = tmp_root / rel
-                if src.exists():
-                    zf.write(src, rel)
-            final_ocr = ocr_meta.get("final", {}).get("file")
-            if final_ocr:
-                src = tmp_root / final_ocr
-                if src.exists():
-                    zf.write(src, final_ocr)
-
-            # Vision pipeline files
-            for stage in vision_meta.get("stages", []):
-                rel = stage["file"]  # e.g. "vision/vision_stage_01_resized.png"
-                src = tmp_root / rel
-                if src.exists():
-                    zf.write(src, rel)
-            final_vis = vision_meta.get("final", {}).get("file")
-            if final_vis:
-                src = tmp_root / final_vis
-                if src.exists():
-                    zf.write(src, final_vis)
-
-            # Metadata + viewer
-            zf.write(metadata_path, "metadata.json")
-            zf.write(viewer_html_path, "viewer.html")
-
-        logger.info(f"[debug] ZIP file ready: {zip_path}")
-
-        return FileResponse(
-            path=str(zip_path),
-            media_type="application/zip",
-            filename="preprocess_debug.zip",
-        )
+    viewer_html = _render_viewer_html(
+        original_name=f"original{original_ext}",
+        ocr_meta=ocr_meta,
+        vision_meta=vision_meta,
+    )
+
+    files = [(Path(original_path), f"original{original_ext}")]
+    files += _stage_files(ocr_meta, tmp_root)
+    files += _stage_files(vision_meta, tmp_root)
+    texts = [
+        ("metadata.json", json.dumps(metadata, indent=2)),
+        ("viewer.html", viewer_html),
+    ]
+
+    logger.info(f"[debug] Streaming ZIP with {len(files) + len(texts)} entries")
+
+    return StreamingResponse(
+        _iter_zip(files, texts, tmpdir.cleanup),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="preprocess_debug.zip"'},
+    )
 
 
-def _write_viewer_html(
-    path: Path,
+def _render_viewer_html(
     original_name: str,
     ocr_meta: dict,
     vision_meta: dict,
-) -> None:
+) -> str:
     """Generate a simple HTML viewer to compare original/OCR/Vision stages."""
     def img_tag(rel_path: str, label: str) -> str:
         return f"""
@@ -238,4 +260,4 @@ def _write_viewer_html(
 </body>
 </html>
 """
-    path.write_text(html, encoding="utf-8")
+    return html
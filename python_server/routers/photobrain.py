@@ -2,11 +2,7 @@
 
 from __future__ import annotations
 
-import os
-
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile
-from loguru import logger
-from qdrant_client import QdrantClient
 
 from ..config import settings  # existing config
 from ..models.photobrain_models import PhotoBrainIngestResponse
@@ -14,28 +10,16 @@ from ..services.photobrain_embedding import PhotoBrainEmbedder
 from ..services.photobrain_store import PhotoBrainStore, PhotoBrainStoreConfig
 from ..services.photobrain_ingest_service import PhotoBrainIngestService
 from ..services.photobrain_autotag import PhotoBrainAutoTagger
+from ..utils.qdrant import get_qdrant_client
 
 
 router = APIRouter()
 
 # --- Singletons / globals ----------------------------------------------------
 
-# Qdrant config: prefer settings, fall back to env, then localhost
-QDRANT_URL = getattr(settings, "qdrant_url", None) or os.getenv(
-    "QDRANT_URL", "http://localhost:6333"
-)
-QDRANT_API_KEY = getattr(settings, "qdrant_api_key", None) or os.getenv(
-    "QDRANT_API_KEY", None
-)
-
-logger.info(f"[PhotoBrain] Qdrant URL: {QDRANT_URL}")
+_qdrant_client = get_qdrant_client()
 
-_qdrant_client = QdrantClient(
-    url=QDRANT_URL,
-    api_key=QDRANT_API_KEY,
-)
-
-_embedder = PhotoBrainEmbedder()
+_embedder = PhotoBrainEmbedder(use_compile=settings.clip_compile)
 _store_config = PhotoBrainStoreConfig(
     collection_name="photobrain",
     vector_size=_embedder.dim,
@@ -45,6 +29,11 @@ _auto_tagger = PhotoBrainAutoTagger()
 _ingest_service = PhotoBrainIngestService(_embedder, _store, auto_tagger=_auto_tagger)
 
 
+async def shutdown_photobrain() -> None:
+    """Called from the app lifespan on shutdown: close pooled HTTP connections."""
+    await _auto_tagger.aclose()
+
+
 # --- Routes ------------------------------------------------------------------
 
 
@@ -2,12 +2,11 @@
 
 from __future__ import annotations
 
-import os
 from pathlib import Path
 
 from fastapi import APIRouter, File, HTTPException, UploadFile, Query
+from fastapi.responses import StreamingResponse
 from loguru import logger
-from qdrant_client import QdrantClient
 
 from ..config import settings
 from ..models.photobrain_query_models import (
@@ -17,62 +16,72 @@ from ..models.photobrain_query_models import (
     PhotoBrainTextSearchRequest,
     PhotoBrainTextSearchResponse,
 )
+from ..services.photobrain_batcher import PhotoBrainSearchBatcher
 from ..services.photobrain_embedding import PhotoBrainEmbedder
 from ..services.photobrain_image_search import PhotoBrainImageSearchService
 from ..services.photobrain_query_service import PhotoBrainQueryService
 from ..services.photobrain_text_search import PhotoBrainTextSearchService
 from ..utils.image_io import save_temp_image
+from ..utils.qdrant import get_async_qdrant_client
 
 
 router = APIRouter()
 
 # --- Shared clients / services ----------------------------------------------
 
-QDRANT_URL = getattr(settings, "qdrant_url", None) or os.getenv(
-    "QDRANT_URL", "http://localhost:6333"
-)
-QDRANT_API_KEY = getattr(settings, "qdrant_api_key", None) or os.getenv(
-    "QDRANT_API_KEY", None
-)
+# Searches await Qdrant on the event loop instead of holding a worker thread
+_qdrant_client = get_async_qdrant_client()
 
-logger.info(f"[PhotoBrain/Query] Using Qdrant URL: {QDRANT_URL}")
-
-_qdrant_client = QdrantClient(
-    url=QDRANT_URL,
-    api_key=QDRANT_API_KEY,
-)
-
-_embedder = PhotoBrainEmbedder()
+_embedder = PhotoBrainEmbedder(use_compile=settings.clip_compile)
 _COLLECTION = "photobrain"
 
+# One batcher for all three services so their queries coalesce together
+_batcher = PhotoBrainSearchBatcher(_qdrant_client, _COLLECTION)
+
 _text_service = PhotoBrainTextSearchService(
     client=_qdrant_client,
     collection_name=_COLLECTION,
     embedder=_embedder,
+    batcher=_batcher,
 )
 
 _image_service = PhotoBrainImageSearchService(
     client=_qdrant_client,
     collection_name=_COLLECTION,
     embedder=_embedder,
+    batcher=_batcher,
 )
 
 _query_service = PhotoBrainQueryService(
     client=_qdrant_client,
     collection_name=_COLLECTION,
     embedder=_embedder,
+    batcher=_batcher,
 )
 
 
+async def shutdown_photobrain_query() -> None:
+    """Called from the app lifespan on shutdown: close pooled HTTP connections."""
+    await _query_service.aclose()
+
+
 # --- Routes ------------------------------------------------------------------
 
 
 @router.post("/search/text", response_model=PhotoBrainTextSearchResponse)
-async def photobrain_search_text(req: PhotoBrainTextSearchRequest) -> PhotoBrainTextSearchResponse:
+async def photobrain_search_text(
+    req: PhotoBrainTextSearchRequest,
+    include_full_metadata: bool = Query(False),
+) -> PhotoBrainTextSearchResponse:
     if not req.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
 
-    matches = _text_service.search(req.query, top_k=req.top_k, filters=req.filters)
+    matches = await _text_service.search(
+        req.query,
+        top_k=req.top_k,
+        filters=req.filters,
+        include_full_metadata=include_full_metadata,
+    )
     return PhotoBrainTextSearchResponse(matches=matches)
 
 
@@ -80,6 +89,7 @@ async def photobrain_search_text(req: PhotoBrainTextSearchRequest) -> PhotoBrain
 async def photobrain_search_image(
     file: UploadFile = File(...),
     top_k: int = Query(12, ge=1, le=50),
+    include_full_metadata: bool = Query(False),
 ) -> PhotoBrainImageSearchResponse:
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
@@ -90,7 +100,12 @@ async def photobrain_search_image(
     # Note: filters would need to be passed via query params or request body
     # For now, image search doesn't support filters in the current API design
     # This can be enhanced in a future version
-    matches = _image_service.search(saved_path, top_k=top_k, filters=None)
+    matches = await _image_service.search(
+        saved_path,
+        top_k=top_k,
+        filters=None,
+        include_full_metadata=include_full_metadata,
+    )
     try:
         Path(saved_path).unlink(missing_ok=True)
     except Exception as ex:
@@ -106,3 +121,15 @@ async def photobrain_query(req: PhotoBrainQaRequest) -> PhotoBrainQaResponse:
 
     return await _query_service.answer_question(req.question, top_k=req.top_k)
 
+
+
+@router.post("/query/stream")
+async def photobrain_query_stream(req: PhotoBrainQaRequest) -> StreamingResponse:
+    """Answer text only, streamed as the model generates it."""
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    return StreamingResponse(
+        _query_service.stream_answer(req.question, top_k=req.top_k),
+        media_type="text/plain; charset=utf-8",
+    )
@@ -1,6 +1,9 @@
 # python_server/routers/rag_image.py
 
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import APIRouter, Depends, FastAPI, UploadFile, File, Query, HTTPException, Request
 from typing import Optional, List
 from loguru import logger
 
@@ -11,62 +14,88 @@ from ..rag import (
     ImageIngestService,
     ImageSearchService,
 )
+from ..rag.image_ingest_service import warmup_ocr_reader
+from ..utils.qdrant import get_qdrant_client
 
 router = APIRouter()
 
-# Singleton instances (lazy-loaded)
-_embedder = None
-_store = None
-_ingest_service = None
-_search_service = None
-
-
-def _get_embedder():
-    """Lazy-load embedder to avoid startup penalty."""
-    global _embedder
-    if _embedder is None:
-        logger.info("[RAG] Initializing CLIP embedder...")
-        _embedder = ImageEmbedder(
-            model_name=settings.clip_model,
-            pretrained=settings.clip_pretrained,
-        )
-    return _embedder
-
-
-def _get_store():
-    """Lazy-load vector store."""
-    global _store
-    if _store is None:
-        from qdrant_client import QdrantClient
-        logger.info(f"[RAG] Connecting to Qdrant at {settings.qdrant_url}")
-        client = QdrantClient(
-            url=settings.qdrant_url,
-            api_key=settings.qdrant_api_key if settings.qdrant_api_key else None,
-        )
-        _store = ImageVectorStore(client=client, dim=settings.embedding_dim)
-    return _store
-
-
-def _get_ingest_service():
-    """Get or create ingest service."""
-    global _ingest_service
-    if _ingest_service is None:
-        _ingest_service = ImageIngestService(
-            store=_get_store(),
-            embedder=_get_embedder(),
-        )
-    return _ingest_service
-
-
-def _get_search_service():
-    """Get or create search service."""
-    global _search_service
-    if _search_service is None:
-        _search_service = ImageSearchService(
-            store=_get_store(),
-            embedder=_get_embedder(),
-        )
-    return _search_service
+# Guards the one code path that builds app.state.rag, so startup and a
+# request-time retry can never construct (and load CLIP) twice
+_rag_lock = asyncio.Lock()
+
+def _load_embedder() -> ImageEmbedder:
+    """Load CLIP. Blocking, and the slow part of RAG init."""
+    logger.info("[RAG] Initializing CLIP embedder...")
+    return ImageEmbedder(
+        model_name=settings.clip_model,
+        pretrained=settings.clip_pretrained,
+        use_compile=settings.clip_compile,
+    )
+
+
+def _connect_store() -> ImageVectorStore:
+    """Connect to Qdrant and ensure the collection exists. Blocking."""
+    return ImageVectorStore(client=get_qdrant_client(), dim=settings.embedding_dim)
+
+
+def build_rag_state(store: ImageVectorStore, embedder: ImageEmbedder) -> SimpleNamespace:
+    """The RAG singletons around an already connected store and loaded embedder."""
+    return SimpleNamespace(
+        embedder=embedder,
+        store=store,
+        ingest=ImageIngestService(store=store, embedder=embedder),
+        search=ImageSearchService(store=store, embedder=embedder),
+    )
+
+
+async def _ensure_rag(app: FastAPI) -> SimpleNamespace:
+    """Return app.state.rag, building it first if needed (double-checked)."""
+    rag = getattr(app.state, "rag", None)
+    if rag is not None:
+        return rag
+
+    async with _rag_lock:
+        rag = getattr(app.state, "rag", None)
+        if rag is None:
+            # Qdrant first, so an outage fails before any model load; the
+            # embedder is kept on its own, so a retry never reloads CLIP
+            store = await asyncio.to_thread(_connect_store)
+            embedder = getattr(app.state, "rag_embedder", None)
+            if embedder is None:
+                embedder = await asyncio.to_thread(_load_embedder)
+                app.state.rag_embedder = embedder
+            rag = build_rag_state(store, embedder)
+            app.state.rag = rag
+    return rag
+
+
+async def init_rag_state(app: FastAPI) -> None:
+    """
+    Called from the app lifespan: build everything before the first request.
+    Failures are logged and left for get_rag to retry, so the server still
+    starts when Qdrant isn't up yet.
+    """
+    app.state.rag = None
+    app.state.rag_embedder = None
+    try:
+        await _ensure_rag(app)
+    except Exception as ex:
+        logger.warning(f"[RAG] Startup init failed (will retry on first request): {ex}")
+
+    # Load EasyOCR too so the first ingest doesn't pay for it
+    try:
+        await asyncio.to_thread(warmup_ocr_reader)
+    except Exception as ex:
+        logger.warning(f"[RAG] EasyOCR warmup failed (will retry lazily): {ex}")
+
+
+async def get_rag(request: Request) -> SimpleNamespace:
+    """Dependency: the ready RAG singletons from app.state."""
+    try:
+        return await _ensure_rag(request.app)
+    except Exception as ex:
+        logger.error(f"[RAG] Init failed: {ex}")
+        raise HTTPException(status_code=503, detail=f"RAG system unavailable: {str(ex)}")
 
 
 @router.post("/image", summary="Ingest an image into RAG")
@@ -74,6 +103,7 @@ async def rag_ingest_image(
     file: UploadFile = File(...),
     extract_ocr: bool = Query(True, description="Extract OCR text"),
     tags: Optional[List[str]] = Query(None, description="User-supplied tags"),
+    rag: SimpleNamespace = Depends(get_rag),
 ):
     """
     Upload and ingest an image into the RAG system.
@@ -87,14 +117,35 @@ async def rag_ingest_image(
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    ingest_service = _get_ingest_service()
-    return await ingest_service.ingest(file, extract_ocr=extract_ocr, tags=tags or [])
+    return await rag.ingest.ingest(file, extract_ocr=extract_ocr, tags=tags or [])
+
+
+@router.post("/images", summary="Ingest several images into RAG")
+async def rag_ingest_images(
+    files: List[UploadFile] = File(...),
+    extract_ocr: bool = Query(True, description="Extract OCR text"),
+    tags: Optional[List[str]] = Query(None, description="User-supplied tags (applied to all)"),
+    rag: SimpleNamespace = Depends(get_rag),
+):
+    """
+    Upload and ingest a batch of images with batched OCR, one CLIP forward
+    pass and one vector store write.
+
+    Returns:
+        List of per-image results (same shape as POST /rag/image), in order.
+    """
+    for file in files:
+        if not file.content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail=f"{file.filename}: file must be an image")
+
+    return await rag.ingest.ingest_many(files, extract_ocr=extract_ocr, tags=tags or [])
 
 
 @router.post("/search/image", summary="Search by visual similarity")
 async def rag_search_image(
     file: UploadFile = File(...),
     limit: int = Query(5, ge=1, le=50, description="Number of results"),
+    rag: SimpleNamespace = Depends(get_rag),
 ):
     """
     Find visually similar images using image-to-image search.
@@ -105,14 +156,14 @@ async def rag_search_image(
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    search_service = _get_search_service()
-    return await search_service.search_by_image(file, limit=limit)
+    return await rag.search.search_by_image(file, limit=limit)
 
 
 @router.post("/search/text", summary="Search by text description")
 async def rag_search_text(
     query: str = Query(..., description="Text query (e.g. 'sunset over mountains')"),
     limit: int = Query(5, ge=1, le=50, description="Number of results"),
+    rag: SimpleNamespace = Depends(get_rag),
 ):
     """
     Find images matching a text description using semantic search.
@@ -123,22 +174,15 @@ async def rag_search_text(
     if not query or not query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
-    search_service = _get_search_service()
-    return await search_service.search_by_text(query, limit=limit)
+    return await rag.search.search_by_text(query, limit=limit)
 
 
 @router.get("/health", summary="RAG system health check")
-async def rag_health():
-    """Check if RAG system is initialized and operational."""
-    try:
-        store = _get_store()
-        return {
-            "status": "ok",
-            "qdrant_url": settings.qdrant_url,
-            "collection": store.COLLECTION,
-            "embedding_dim": settings.embedding_dim,
-        }
-    except Exception as ex:
-        logger.error(f"[RAG] Health check failed: {ex}")
-        raise HTTPException(status_code=503, detail=f"RAG system unavailable: {str(ex)}")
-
+async def rag_health(rag: SimpleNamespace = Depends(get_rag)):
+    """Check if RAG system is initialized and operational (503 via get_rag if not)."""
+    return {
+        "status": "ok",
+        "qdrant_url": settings.qdrant_url,
+        "collection": rag.store.COLLECTION,
+        "embedding_dim": settings.embedding_dim,
+    }
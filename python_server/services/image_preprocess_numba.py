@@ -0,0 +1,93 @@
+# python_server/services/image_preprocess_numba.py
+
+from __future__ import annotations
+
+import numpy as np
+from loguru import logger
+
+try:
+    import numba
+    from numba import get_num_threads, njit, prange
+except ImportError:  # pragma: no cover - optional speedup
+    numba = None
+
+
+if numba is not None:
+
+    @njit(cache=True, nogil=True)
+    def _otsu_threshold(hist):
+        # Same recurrence as OpenCV's getThreshVal_Otsu_8u, so thresholds match
+        total = 0
+        for i in range(256):
+            total += hist[i]
+        if total == 0:
+            return 0
+
+        mu = 0.0
+        for i in range(256):
+            mu += i * (hist[i] / total)
+
+        eps = 1.1920928955078125e-07  # FLT_EPSILON
+        q1 = 0.0
+        mu1 = 0.0
+        max_sigma = 0.0
+        max_val = 0
+        for i in range(256):
+            p_i = hist[i] / total
+            mu1 *= q1
+            q1 += p_i
+            q2 = 1.0 - q1
+            if min(q1, q2) < eps or max(q1, q2) > 1.0 - eps:
+                continue
+            mu1 = (mu1 + i * p_i) / q1
+            mu2 = (mu - q1 * mu1) / q2
+            sigma = q1 * q2 * (mu1 - mu2) * (mu1 - mu2)
+            if sigma > max_sigma:
+                max_sigma = sigma
+                max_val = i
+        return max_val
+
+    @njit(cache=True, nogil=True, parallel=True)
+    def _otsu_binarize_kernel(gray, out, n_bands):
+        # Per-thread row-band histograms, then one parallel write pass
+        h, w = gray.shape
+        n_bands = max(1, min(n_bands, h))
+        rows_per = (h + n_bands - 1) // n_bands
+
+        band_hist = np.zeros((n_bands, 256), dtype=np.int64)
+        for b in prange(n_bands):
+            r0 = b * rows_per
+            r1 = min(h, r0 + rows_per)
+            for i in range(r0, r1):
+                for j in range(w):
+                    band_hist[b, gray[i, j]] += 1
+
+        hist = np.zeros(256, dtype=np.int64)
+        for b in range(n_bands):
+            for k in range(256):
+                hist[k] += band_hist[b, k]
+
+        t = _otsu_threshold(hist)
+        for i in prange(h):
+            for j in range(w):
+                out[i, j] = 255 if gray[i, j] > t else 0
+        return t
+
+    def otsu_binarize(gray: np.ndarray, out: np.ndarray) -> int:
+        """
+        Otsu-binarize a C-contiguous uint8 image into out (same shape).
+        Returns the threshold used.
+        """
+        # Thread count is read here: calling it inside the kernel defeats cache=True
+        return int(_otsu_binarize_kernel(gray, out, get_num_threads()))
+
+    # Compile (or load from the on-disk cache) up front, not on the first request
+    try:
+        _warm = np.zeros((64, 64), dtype=np.uint8)
+        otsu_binarize(_warm, np.empty_like(_warm))
+    except Exception as ex:  # pragma: no cover - broken numba install
+        logger.warning(f"Numba Otsu kernel unavailable, using OpenCV: {ex}")
+        otsu_binarize = None
+
+else:
+    otsu_binarize = None
@@ -6,26 +6,29 @@ from PIL import Image  # not strictly needed anymore but fine if kept
 import easyocr
 
 from ..models.image_models import OcrTextResponse
-from ..utils.image_io import save_temp_image
-from .image_preprocess import preprocess_image_for_ocr, OcrPreprocessConfig
+from ..utils.cpu_threads import run_cpu_bound
+from .image_preprocess import preprocess_ocr_array, OcrPreprocessConfig
 
 # Initialize once (can use GPU; you already have torch)
 _reader = easyocr.Reader(["en"], gpu=True)
 
 
 async def ocr_image(file: UploadFile, preprocess: bool = False) -> OcrTextResponse:
-    saved_path = await save_temp_image(file)
-    logger.info(f"OCR input saved at {saved_path}")
+    # Nothing is kept after the request, so the upload never touches disk:
+    # EasyOCR takes encoded bytes or a numpy array directly
+    data = await file.read()
+    name = file.filename or "upload"
+    logger.info(f"OCR input received: {name} ({len(data)} bytes)")
 
-    processed_path = saved_path
+    ocr_input = data
     if preprocess:
         cfg = OcrPreprocessConfig()
-        processed_path = preprocess_image_for_ocr(saved_path, cfg)
-        logger.info(f"OCR preprocessing applied: {processed_path}")
+        ocr_input = await run_cpu_bound(preprocess_ocr_array, data, cfg)
+        logger.info(f"OCR preprocessing applied: {name}")
 
-    logger.info(f"Running OCR on {processed_path}")
+    logger.info(f"Running OCR on {name}")
 
-    result = _reader.readtext(processed_path, detail=1)
+    result = _reader.readtext(ocr_input, detail=1)
 
     # result is list of [bbox, text, confidence]
     texts = []
@@ -37,7 +40,7 @@ async def ocr_image(file: UploadFile, preprocess: bool = False) -> OcrTextRespon
     joined = "\n".join(texts).strip()
     avg_conf = float(sum(confidences) / len(confidences)) if confidences else None
 
-    logger.info(f"OCR extracted {len(texts)} segments from {processed_path}")
+    logger.info(f"OCR extracted {len(texts)} segments from {name}")
 
     return OcrTextResponse(
         text=joined,
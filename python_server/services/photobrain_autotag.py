@@ -2,16 +2,19 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
+import mmap
+import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional
 
-import base64
 import httpx
+import orjson
 from loguru import logger
 
 from ..config import settings
+from ..utils.b64 import b64encode, json_with_images
 
 
 # Canonical categories we want PhotoBrain to use
@@ -29,6 +32,33 @@ CANONICAL_CATEGORIES = [
     "photo_of_object",
     "other",
 ]
+_CANONICAL_SET = frozenset(CANONICAL_CATEGORIES)
+
+# Best-effort mapping when the model returns something close to a category
+_ALIAS_MAP = {
+    "receipt": "receipt",
+    "invoice": "invoice",
+    "serial": "serial_plate",
+    "plate": "serial_plate",
+    "whiteboard": "whiteboard",
+    "screenshot": "screenshot",
+    "handwrit": "handwritten_notes",
+    "form": "form",
+    "doc": "document",  # also covers "document"
+}
+_ALIAS_RE = re.compile("|".join(_ALIAS_MAP))
+
+
+def _encode_image_b64(path: Path) -> bytes:
+    """
+    Base64-encode a file straight from an mmap: the raw bytes are paged in
+    from the page cache rather than copied into a heap buffer, and the
+    encoded bytes are the only allocation.
+    """
+    if path.stat().st_size == 0:
+        return b""  # mmap can't map an empty file
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return b64encode(mm)
 
 
 @dataclass
@@ -57,8 +87,19 @@ class PhotoBrainAutoTagger:
             or "llava"
         )
         self.base_url = (base_url or settings.ollama_base_url).rstrip("/")
+        # One pooled client for the process: keep-alive connections instead of
+        # a fresh connect (and HTTP/2 negotiation where offered) per image
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=120.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
         logger.info(f"[PhotoBrain/AutoTag] Using model={self.model}, base_url={self.base_url}")
 
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
     async def auto_tag(
         self,
         image_path: str,
@@ -75,9 +116,8 @@ class PhotoBrainAutoTagger:
             return None
 
         try:
-            with path.open("rb") as f:
-                image_bytes = f.read()
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+            # Off the event loop: large images take a while to read + encode
+            image_b64 = await asyncio.to_thread(_encode_image_b64, path)
         except Exception as ex:
             logger.error(f"[PhotoBrain/AutoTag] Failed to read {path}: {ex}")
             return None
@@ -124,15 +164,17 @@ If OCR text is provided, use it to help understand context.
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "images": [image_b64],
             "stream": False,
         }
 
         try:
-            async with httpx.AsyncClient(base_url=self.base_url, timeout=120.0) as client:
-                resp = await client.post("/api/generate", json=payload)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self._client.post(
+                "/api/generate",
+                content=json_with_images(payload, [image_b64]),
+                headers={"content-type": "application/json"},
+            )
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
         except Exception as ex:
             logger.error(f"[PhotoBrain/AutoTag] Ollama call failed: {ex}")
             return None
@@ -150,7 +192,7 @@ If OCR text is provided, use it to help understand context.
                 json_str = raw_resp[start : end + 1]
             else:
                 json_str = raw_resp
-            parsed = json.loads(json_str)
+            parsed = orjson.loads(json_str)
         except Exception as ex:
             logger.error(f"[PhotoBrain/AutoTag] Failed to parse JSON: {ex}")
             return None
@@ -160,31 +202,12 @@ If OCR text is provided, use it to help understand context.
         confidence = float(parsed.get("confidence") or 0.0)
 
         # normalize category to one of our canonical ones
-        canonical = "other"
-        for c in CANONICAL_CATEGORIES:
-            if category == c:
-                canonical = c
-                break
-
-        # best-effort mapping if model returns something close
-        if canonical == "other":
-            # simple heuristics
-            if "receipt" in category:
-                canonical = "receipt"
-            elif "invoice" in category:
-                canonical = "invoice"
-            elif "serial" in category or "plate" in category:
-                canonical = "serial_plate"
-            elif "whiteboard" in category:
-                canonical = "whiteboard"
-            elif "screenshot" in category:
-                canonical = "screenshot"
-            elif "handwrit" in category:
-                canonical = "handwritten_notes"
-            elif "form" in category:
-                canonical = "form"
-            elif "document" in category or "doc" in category:
-                canonical = "document"
+        if category in _CANONICAL_SET:
+            canonical = category
+        else:
+            # one regex pass over the alias keywords
+            m = _ALIAS_RE.search(category)
+            canonical = _ALIAS_MAP[m.group(0)] if m else "other"
 
         # normalize tags to short strings
         tags_out: List[str] = []
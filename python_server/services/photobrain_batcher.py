@@ -0,0 +1,72 @@
+# python_server/services/photobrain_batcher.py
+
+from __future__ import annotations
+
+from typing import List, Optional, Union
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Filter,
+    PayloadSelector,
+    QueryRequest,
+    ScoredPoint,
+    SearchParams,
+)
+
+from ..utils.batching import Coalescer
+
+
+class PhotoBrainSearchBatcher(Coalescer):
+    """
+    Coalesces concurrent PhotoBrain vector queries into one Qdrant
+    query_batch_points round-trip. A query Qdrant rejects (e.g. a bad
+    filter) fails only its own caller.
+    """
+
+    def __init__(self, client: AsyncQdrantClient, collection_name: str, max_batch: int = 16) -> None:
+        super().__init__(self._run_batch, max_batch)
+        self.client = client
+        self.collection_name = collection_name
+
+    async def query(
+        self,
+        vec: np.ndarray,
+        limit: int,
+        query_filter: Optional[Filter] = None,
+        search_params: Optional[SearchParams] = None,
+        with_payload: Union[bool, PayloadSelector] = True,
+    ) -> List[ScoredPoint]:
+        # float32 and contiguous once, here, for both the single and batched calls
+        vec = np.ascontiguousarray(vec, dtype=np.float32)
+        return await self.submit((vec, limit, query_filter, search_params, with_payload))
+
+    async def _run_batch(self, items: list) -> List[List[ScoredPoint]]:
+        # A lone query keeps the plain query_points call
+        if len(items) == 1:
+            vec, limit, query_filter, params, with_payload = items[0]
+            response = await self.client.query_points(
+                collection_name=self.collection_name,
+                query=vec,
+                query_filter=query_filter,
+                search_params=params,
+                limit=limit,
+                with_payload=with_payload,
+            )
+            return [response.points]
+
+        requests = [
+            QueryRequest(
+                query=vec.tolist(),
+                filter=query_filter,
+                params=params,
+                limit=limit,
+                with_payload=with_payload,
+            )
+            for vec, limit, query_filter, params, with_payload in items
+        ]
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=requests,
+        )
+        return [r.points for r in responses]
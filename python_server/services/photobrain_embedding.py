@@ -2,26 +2,37 @@
 
 from __future__ import annotations
 
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
 from loguru import logger
 import open_clip
 
+from ..utils.batching import EmbedBatcher
+
 
 class PhotoBrainEmbedder:
     """
     Embeds images and text into a shared CLIP embedding space.
     """
 
+    TEXT_CACHE_SIZE = 2048
+
     def __init__(
         self,
         model_name: str = "ViT-L-14",
         pretrained: str = "openai",
         device: Optional[str] = None,
+        use_compile: bool = False,
     ) -> None:
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(
@@ -31,46 +42,177 @@ class PhotoBrainEmbedder:
             model_name, pretrained=pretrained
         )
         self.model.eval().to(self.device)
+
+        # Half precision on GPU (BF16 on Ampere+, else FP16): half the weight
+        # traffic and tensor-core matmuls. Outputs are FP32 again before
+        # normalization; CPU stays FP32.
+        self._on_cuda = self.device.startswith("cuda")
+        if self._on_cuda:
+            self.dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            self.model = self.model.to(self.dtype)
+        else:
+            self.dtype = torch.float32
+
         self.tokenizer = open_clip.get_tokenizer(model_name)
+        # Computed once; the store config and zero-vector fallbacks read it often
+        self._dim = self._infer_dim()
+        # PIL decode/resize release the GIL, so batch items preprocess in parallel
+        self._prep_pool = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="photobrain-prep"
+        )
+        # Search queries repeat a lot; per instance, so a new model starts empty
+        self._text_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._text_cache_lock = threading.Lock()
+
+        self._encode_image = self.model.encode_image
+        self._encode_text = self.model.encode_text
+        if use_compile:
+            self._compile_encoders()
+
+        # Concurrent async callers (search requests) share batched forwards
+        self._text_batcher = EmbedBatcher(self.embed_texts)
+        self._image_batcher = EmbedBatcher(self.embed_images)
+
+    def _compile_encoders(self) -> None:
+        """
+        Wrap both encoders in torch.compile (Inductor; CUDA graphs on GPU) and
+        warm them up so the first request doesn't pay the compile. Each new
+        batch shape compiles once more. Falls back to eager when the
+        toolchain (Triton / a C++ compiler) is missing.
+        """
+        if not hasattr(torch, "compile"):
+            logger.warning("[PhotoBrain] torch.compile needs PyTorch 2.x, using eager CLIP")
+            return
+
+        mode = "reduce-overhead" if self._on_cuda else "default"
+        logger.info(f"[PhotoBrain] Compiling CLIP encoders with torch.compile ({mode})")
+        try:
+            self._encode_image = torch.compile(self.model.encode_image, mode=mode, dynamic=False)
+            self._encode_text = torch.compile(self.model.encode_text, mode=mode, dynamic=False)
+            size = self.model.visual.image_size
+            h, w = tuple(size) if isinstance(size, (tuple, list)) else (size, size)
+            dummy = torch.zeros(1, 3, h, w, device=self.device, dtype=self.dtype)
+            tokens = self.tokenizer(["warmup"]).to(self.device)
+            with self._inference():
+                self._encode_image(dummy)
+                self._encode_text(tokens)
+        except Exception as ex:
+            logger.warning(f"[PhotoBrain] torch.compile unavailable, using eager CLIP: {ex}")
+            self._encode_image = self.model.encode_image
+            self._encode_text = self.model.encode_text
 
     @property
     def dim(self) -> int:
-        # CLIP features are in model's embed dimension
-        # We can infer it by running a dummy forward once,
-        # but many ViT-L-14 models use 768 or 1024 dimensions.
-        # Safer: inspect actual feature size.
-        dummy = torch.zeros(1, 3, 224, 224).to(self.device)
-        with torch.no_grad():
+        return self._dim
+
+    def _infer_dim(self) -> int:
+        # open_clip vision towers expose their embed size; otherwise run one
+        # dummy forward (ViT-L-14 variants use 768 or 1024 dimensions)
+        out_dim = getattr(self.model.visual, "output_dim", None)
+        if out_dim:
+            return int(out_dim)
+        size = self.model.visual.image_size
+        h, w = tuple(size) if isinstance(size, (tuple, list)) else (size, size)
+        dummy = torch.zeros(1, 3, h, w, device=self.device, dtype=self.dtype)
+        with self._inference():
             feat = self.model.encode_image(dummy)
         return int(feat.shape[-1])
 
-    def embed_image(self, path: str) -> np.ndarray:
-        img = Image.open(path).convert("RGB")
-        tensor = self.preprocess(img).unsqueeze(0).to(self.device)
+    @contextmanager
+    def _inference(self):
+        # Autocast keeps layer norm / softmax in FP32 around the half matmuls.
+        # Its weight-cast cache stays off so it can't leak into CUDA graphs;
+        # the weights are already in self.dtype.
+        with torch.inference_mode(), torch.autocast(
+            device_type="cuda", dtype=self.dtype, enabled=self._on_cuda, cache_enabled=False
+        ):
+            yield
+
+    def _load_image(self, path: str) -> torch.Tensor:
+        with Image.open(path) as img:
+            return self.preprocess(img.convert("RGB"))
+
+    def _image_features(self, paths: List[str]) -> torch.Tensor:
+        """(N, D) L2-normalized FP32 features, left on the model device."""
+        if len(paths) > 1:
+            tensors = list(self._prep_pool.map(self._load_image, paths))
+        else:
+            tensors = [self._load_image(paths[0])]
+        batch = torch.stack(tensors).to(self.device, dtype=self.dtype, non_blocking=True)
+
+        with self._inference():
+            feat = self._encode_image(batch)
+            # Normalize on-device (zero vectors stay zero)
+            return F.normalize(feat.float(), dim=-1)
+
+    def embed_images(self, paths: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Embed many images with one encode_image call per batch_size chunk.
+        Returns (N, D) L2-normalized vectors.
+        """
+        out: list[np.ndarray] = []
+        for start in range(0, len(paths), batch_size):
+            # One device -> host copy per chunk, already normalized
+            out.append(self._image_features(paths[start : start + batch_size]).cpu().numpy())
 
-        with torch.no_grad():
-            feat = self.model.encode_image(tensor)
+        if not out:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate(out)
 
-        vec = feat.cpu().float().numpy()[0]
-        norm = np.linalg.norm(vec)
-        if norm > 0:
-            vec = vec / norm
-        return vec
+    def embed_image(self, path: str) -> np.ndarray:
+        return self.embed_images([path])[0]
 
     def embed_text(self, text: str) -> np.ndarray:
-        if not text.strip():
-            # Empty text → zero vector (will be ignored or combined with image vec)
-            return np.zeros(self.dim, dtype=np.float32)
+        return self.embed_texts([text])[0]
 
-        tokens = self.tokenizer([text]).to(self.device)
-        with torch.no_grad():
-            feat = self.model.encode_text(tokens)
+    def _text_features(self, texts: List[str]) -> torch.Tensor:
+        """(N, D) L2-normalized FP32 features, left on the model device."""
+        tokens = self.tokenizer(texts).to(self.device)
+        with self._inference():
+            feat = self._encode_text(tokens)
+            return F.normalize(feat.float(), dim=-1)
 
-        vec = feat.cpu().float().numpy()[0]
-        norm = np.linalg.norm(vec)
-        if norm > 0:
-            vec = vec / norm
-        return vec
+    def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed many texts; cached ones are reused and the rest go through a
+        single encode_text call. Returned vectors are read-only.
+        """
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+        misses: dict[str, List[int]] = {}
+        with self._text_cache_lock:
+            for i, text in enumerate(texts):
+                if not text.strip():
+                    # Empty text → zero vector (will be ignored or combined with image vec)
+                    out[i] = np.zeros(self.dim, dtype=np.float32)
+                    continue
+                cached = self._text_cache.get(text)
+                if cached is not None:
+                    self._text_cache.move_to_end(text)
+                    out[i] = cached
+                else:
+                    misses.setdefault(text, []).append(i)
+
+        if misses:
+            vecs = self._text_features(list(misses)).cpu().numpy()
+            # Shared between callers, so make it read-only
+            vecs.setflags(write=False)
+
+            with self._text_cache_lock:
+                for (text, idxs), vec in zip(misses.items(), vecs):
+                    self._text_cache[text] = vec
+                    for i in idxs:
+                        out[i] = vec
+                while len(self._text_cache) > self.TEXT_CACHE_SIZE:
+                    self._text_cache.popitem(last=False)
+        return out
+
+    async def embed_text_async(self, text: str) -> np.ndarray:
+        """embed_text, batched with other concurrent callers."""
+        return await self._text_batcher.embed(text)
+
+    async def embed_image_async(self, path: str) -> np.ndarray:
+        """embed_image, batched with other concurrent callers."""
+        return await self._image_batcher.embed(path)
 
     def embed_image_and_text(self, image_path: str, text: str | None) -> np.ndarray:
         """
@@ -78,15 +220,14 @@ class PhotoBrainEmbedder:
         If text is empty, this is just the image vector.
         If text is present, we average and renormalize.
         """
-        img_vec = self.embed_image(image_path)
-        if not text:
-            return img_vec
-
-        txt_vec = self.embed_text(text)
+        img_feat = self._image_features([image_path])[0]
+        if not text or not text.strip():
+            return img_feat.cpu().numpy()
 
-        combined = img_vec + txt_vec
-        norm = np.linalg.norm(combined)
-        if norm > 0:
-            combined = combined / norm
-        return combined.astype(np.float32)
+        # OCR text is unique per image: encode it directly rather than via
+        # the query cache, where it would only evict search queries
+        txt_feat = self._text_features([text])[0]
 
+        with self._inference():
+            combined = F.normalize(img_feat + txt_feat, dim=-1)
+        return combined.cpu().numpy()
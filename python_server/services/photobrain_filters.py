@@ -2,15 +2,130 @@
 
 from __future__ import annotations
 
+import re
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from loguru import logger
+from qdrant_client.http.models import (
+    DatetimeRange,
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchText,
+    MatchValue,
+    PayloadField,
+    Range,
+)
 
 from ..models.photobrain_filters import PhotoBrainFilterRequest
 from ..models.photobrain_query_models import PhotoBrainSearchMatch
 
 
+def _as_utc(dt: datetime) -> datetime:
+    # Handle both aware and naive datetimes
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def filters_to_qdrant(
+    filters: Optional[PhotoBrainFilterRequest],
+) -> Tuple[Optional[Filter], Optional[PhotoBrainFilterRequest]]:
+    """
+    Split filters into a Qdrant Filter (evaluated inside the HNSW search,
+    backed by the payload indexes) and the residual that only apply_filters
+    can express: case-insensitive tag matches and substring scans.
+
+    Returns (qdrant_filter, residual); either may be None.
+    """
+    if filters is None:
+        return None, None
+
+    must: list = []
+
+    if filters.confidence_min is not None:
+        must.append(FieldCondition(key="ocr_confidence", range=Range(gte=filters.confidence_min)))
+
+    # Stored categories are the AutoTagger's lowercase canonical names
+    if filters.category:
+        must.append(FieldCondition(key="category", match=MatchValue(value=filters.category.lower())))
+
+    # Relative window: undated points never qualify
+    if filters.days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=filters.days)
+        must.append(FieldCondition(key="ingested_at", range=DatetimeRange(gte=since)))
+
+    # Absolute range: undated points pass, as in apply_filters
+    date_min = _as_utc(filters.date_min) if filters.date_min else None
+    date_max = _as_utc(filters.date_max) if filters.date_max else None
+    if date_min or date_max:
+        must.append(
+            Filter(
+                should=[
+                    FieldCondition(key="ingested_at", range=DatetimeRange(gte=date_min, lte=date_max)),
+                    IsEmptyCondition(is_empty=PayloadField(key="ingested_at")),
+                ]
+            )
+        )
+
+    residual = filters.model_copy(
+        update={"confidence_min": None, "category": None, "days": None, "date_min": None, "date_max": None}
+    )
+    has_residual = bool(residual.tag or residual.tags or residual.contains_text or residual.device)
+
+    return (Filter(must=must) if must else None), (residual if has_residual else None)
+
+
+# "taken with a Canon EOS R6", "shot on my Pixel 8?"
+_DEVICE_RE = re.compile(
+    r"\b(?:taken|took|shot|shoot|captured|photographed)\s+(?:with|on|by)\s+(?:an?\s+|my\s+|the\s+)?"
+    r"([a-z0-9][\w\-]*(?:\s+[a-z0-9][\w\-]*){0,3}?)"
+    r"(?=\s*[?.!,]|\s+(?:in|on|during|from|last|this|since|at|today|yesterday)\b|\s*$)",
+    re.IGNORECASE,
+)
+# "in the last 3 weeks", "past 10 days"
+_LAST_N_RE = re.compile(r"\b(?:last|past)\s+(\d{1,4})\s+(day|week|month|year)s?\b", re.IGNORECASE)
+# "last week", "this month", "past year"
+_LAST_UNIT_RE = re.compile(r"\b(?:last|past|this)\s+(day|week|month|year)\b", re.IGNORECASE)
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 31, "year": 366}
+
+
+def filters_from_question(question: str) -> Optional[Filter]:
+    """
+    Qdrant filter for the device / recency predicates a QA question states
+    outright ("shot on a Canon EOS in the last 2 weeks"). Both map to
+    indexed payload fields, so they prefilter the vector search. None if
+    the question has neither.
+    """
+    must: list = []
+
+    m = _DEVICE_RE.search(question)
+    if m:
+        device = m.group(1)
+        must.append(
+            Filter(
+                should=[
+                    FieldCondition(key="exif.device_model", match=MatchText(text=device)),
+                    FieldCondition(key="exif.device_make", match=MatchText(text=device)),
+                ]
+            )
+        )
+
+    days = None
+    if m := _LAST_N_RE.search(question):
+        days = int(m.group(1)) * _UNIT_DAYS[m.group(2).lower()]
+    elif m := _LAST_UNIT_RE.search(question):
+        days = _UNIT_DAYS[m.group(1).lower()]
+    elif re.search(r"\btoday\b", question, re.IGNORECASE):
+        days = 1
+    elif re.search(r"\byesterday\b", question, re.IGNORECASE):
+        days = 2
+    if days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        must.append(FieldCondition(key="ingested_at", range=DatetimeRange(gte=since)))
+
+    return Filter(must=must) if must else None
+
+
 def apply_filters(
     matches: List[PhotoBrainSearchMatch],
     filters: Optional[PhotoBrainFilterRequest]
@@ -34,79 +149,73 @@ def apply_filters(
     out = []
     now = datetime.now(timezone.utc)
 
+    # Everything derived from the filters is computed once per call
+    days_cutoff = now - timedelta(days=filters.days) if filters.days is not None else None
+    date_min = _as_utc(filters.date_min) if filters.date_min else None
+    date_max = _as_utc(filters.date_max) if filters.date_max else None
+    tag_l = filters.tag.lower().strip() if filters.tag else None
+    required_tags = [t.lower() for t in filters.tags] if filters.tags else None
+    text_l = filters.contains_text.lower() if filters.contains_text else None
+    device_l = filters.device.lower() if filters.device else None
+    category_l = filters.category.lower() if filters.category else None
+    confidence_min = filters.confidence_min
+    check_dates = days_cutoff is not None or date_min is not None or date_max is not None
+
+    # Cheap scalar checks first, substring scans last; first failure skips the match
     for m in matches:
         meta = m.metadata or {}
-        exif = meta.get("exif", {})
-        ocr = m.ocr_text or ""
-        tags = meta.get("tags") or []
-
-        ok = True
-
-        # Last N days (relative filter)
-        if filters.days is not None:
-            if m.ingested_at is None:
-                ok = False
-            else:
-                # Handle both aware and naive datetimes
-                ing_at = m.ingested_at
-                if ing_at.tzinfo is None:
-                    ing_at = ing_at.replace(tzinfo=timezone.utc)
-                cutoff = now - timedelta(days=filters.days)
-                if ing_at < cutoff:
-                    ok = False
-
-        # Date range filters
-        if filters.date_min and m.ingested_at:
-            ing_at = m.ingested_at
-            if ing_at.tzinfo is None:
-                ing_at = ing_at.replace(tzinfo=timezone.utc)
-            if ing_at < filters.date_min:
-                ok = False
-                
-        if filters.date_max and m.ingested_at:
-            ing_at = m.ingested_at
-            if ing_at.tzinfo is None:
-                ing_at = ing_at.replace(tzinfo=timezone.utc)
-            if ing_at > filters.date_max:
-                ok = False
-
-        # Tag substring match (case-insensitive)
-        if filters.tag:
-            t = filters.tag.lower()
-            if not any(t in x.lower() for x in tags):
-                ok = False
-
-        # AND match all tags in list
-        if filters.tags:
-            required = [t.lower() for t in filters.tags]
-            lower_tags = [t.lower() for t in tags]
-            if not all(t in lower_tags for t in required):
-                ok = False
-
-        # OCR text substring match (case-insensitive)
-        if filters.contains_text:
-            if filters.contains_text.lower() not in ocr.lower():
-                ok = False
 
         # OCR confidence minimum threshold
-        if filters.confidence_min is not None:
-            if m.ocr_confidence is None or m.ocr_confidence < filters.confidence_min:
-                ok = False
+        if confidence_min is not None:
+            if m.ocr_confidence is None or m.ocr_confidence < confidence_min:
+                continue
+
+        # Category exact match (case-insensitive)
+        if category_l:
+            cat = meta.get("category")
+            if not cat or category_l != cat.lower():
+                continue
+
+        if check_dates:
+            ing_at = _as_utc(m.ingested_at) if m.ingested_at else None
+
+            # Last N days (relative filter); undated matches never qualify
+            if days_cutoff is not None and (ing_at is None or ing_at < days_cutoff):
+                continue
+
+            # Date range filters
+            if ing_at is not None:
+                if date_min is not None and ing_at < date_min:
+                    continue
+                if date_max is not None and ing_at > date_max:
+                    continue
+
+        if tag_l or required_tags:
+            lower_tags = [t.lower() for t in meta.get("tags") or []]
+
+            # Tag substring match (case-insensitive)
+            if tag_l and not any(tag_l in x for x in lower_tags):
+                continue
+
+            # AND match all tags in list
+            if required_tags:
+                tag_set = set(lower_tags)
+                if not all(t in tag_set for t in required_tags):
+                    continue
 
         # Device model substring match (case-insensitive)
-        if filters.device:
+        if device_l:
+            exif = meta.get("exif", {})
             dev = (exif.get("device_model") or exif.get("Model") or "").lower()
-            if filters.device.lower() not in dev:
-                ok = False
+            if device_l not in dev:
+                continue
 
-        # Category exact match (case-insensitive)
-        if filters.category:
-            cat = meta.get("category")
-            if not cat or filters.category.lower() != cat.lower():
-                ok = False
+        # OCR text substring match (case-insensitive)
+        if text_l:
+            if text_l not in (m.ocr_text or "").lower():
+                continue
 
-        if ok:
-            out.append(m)
+        out.append(m)
 
     logger.info(f"[PhotoBrain/Filters] Filtered {len(matches)} → {len(out)} results")
     return out
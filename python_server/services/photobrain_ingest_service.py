@@ -2,20 +2,25 @@
 
 from __future__ import annotations
 
-import hashlib
+import asyncio
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional, Tuple
 
+import numpy as np
 from fastapi import UploadFile
 from loguru import logger
 from PIL import Image, ExifTags
+from qdrant_client.http.models import Record
 
 from ..models.photobrain_models import PhotoBrainIngestResponse
-from ..utils.image_io import save_temp_image
+from ..utils.cpu_threads import run_cpu_bound
+from ..utils.hashing import HASH_ALG
+from ..utils.image_io import save_content_addressed
 from .image_preprocess import (
     preprocess_image_for_ocr,
     preprocess_image_for_vision,
@@ -25,22 +30,21 @@ from .photobrain_store import PhotoBrainStore
 from .photobrain_autotag import PhotoBrainAutoTagger
 
 
-def _compute_sha256(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1 << 20), b""):
-            if not chunk:
-                break
-            h.update(chunk)
-    return h.hexdigest()
+# OCR and CLIP share the GPU (CUDA context + memory); one worker runs them in
+# turn instead of letting concurrent ingests contend for the device
+_gpu_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photobrain-gpu")
 
 
 def _extract_exif_metadata(path: Path) -> dict:
     """Extract EXIF metadata and convert all values to JSON-serializable types."""
     meta: dict = {}
     try:
-        img = Image.open(path)
-        exif = img.getexif()
+        # open() only parses the headers (no pixel decode); closing the file
+        # right away instead of leaving it to GC
+        with Image.open(path) as img:
+            exif = img.getexif()
+            # DateTimeOriginal lives in the Exif sub-IFD, not in IFD0
+            exif_ifd = exif.get_ifd(ExifTags.IFD.Exif) if exif else {}
         if not exif:
             return meta
 
@@ -67,6 +71,8 @@ def _extract_exif_metadata(path: Path) -> dict:
         # Extract some common fields
         if "DateTimeOriginal" in tagged:
             meta["datetime_original"] = str(tagged["DateTimeOriginal"])
+        elif ExifTags.Base.DateTimeOriginal in exif_ifd:
+            meta["datetime_original"] = str(exif_ifd[ExifTags.Base.DateTimeOriginal])
         if "Model" in tagged:
             meta["device_model"] = str(tagged["Model"])
         if "Make" in tagged:
@@ -80,31 +86,43 @@ def _extract_exif_metadata(path: Path) -> dict:
     return meta
 
 
-def _run_easyocr(path: Path) -> Tuple[Optional[str], Optional[float]]:
+# EasyOCR boxes below this confidence are left out of ocr_text
+_MIN_BOX_CONFIDENCE = 0.3
+
+
+def _run_easyocr(
+    path: Path,
+    image: Optional[np.ndarray] = None,
+) -> Tuple[Optional[str], Optional[float]]:
     try:
         # Reuse global EasyOCR reader from ocr_service to avoid re-init cost
         from .ocr_service import _reader as easyocr_reader  # type: ignore
 
         logger.info(f"[PhotoBrain] Running EasyOCR on {path}")
-        result = easyocr_reader.readtext(str(path), detail=1)
+        # Prefer the in-memory preprocessed array over re-decoding the file
+        result = easyocr_reader.readtext(image if image is not None else str(path), detail=1)
 
-        texts = []
-        confs = []
-        for _, text, conf in result:
-            texts.append(text)
-            confs.append(float(conf))
+        if not result:
+            return None, None
 
-        if not texts:
+        # Drop low-confidence boxes: mostly noise that pollutes text search
+        confs = np.fromiter((box[2] for box in result), dtype=np.float32, count=len(result))
+        keep = np.flatnonzero(confs >= _MIN_BOX_CONFIDENCE)
+        if keep.size == 0:
             return None, None
 
-        joined = "\n".join(texts).strip()
-        avg_conf = sum(confs) / len(confs) if confs else None
+        joined = "\n".join([result[i][1] for i in keep]).strip()
+        avg_conf = float(confs[keep].mean())
         return joined, avg_conf
     except Exception as ex:
         logger.error(f"[PhotoBrain] OCR failed for {path}: {ex}")
         return None, None
 
 
+async def _none() -> None:
+    return None
+
+
 class PhotoBrainIngestService:
     """
     High-level pipeline for PhotoBrain ingestion.
@@ -120,6 +138,60 @@ class PhotoBrainIngestService:
         self.store = store
         self.auto_tagger = auto_tagger or PhotoBrainAutoTagger()
 
+    async def _auto_tag(self, work_path: Path, ocr_text: Optional[str]):
+        if self.auto_tagger is None:
+            return None
+        try:
+            return await self.auto_tagger.auto_tag(str(work_path), ocr_text=ocr_text)
+        except Exception as ex:
+            logger.error(f"[PhotoBrain] Auto-tagging failed: {ex}")
+            return None
+
+    async def _embed(self, work_path: Path, ocr_text: Optional[str]) -> Optional[list]:
+        try:
+            unified = await asyncio.get_running_loop().run_in_executor(
+                _gpu_pool, self.embedder.embed_image_and_text, str(work_path), ocr_text or ""
+            )
+            return unified.tolist()
+        except Exception as ex:
+            logger.error(f"[PhotoBrain] Embedding failed: {ex}")
+            return None
+
+    async def _refresh_duplicate(
+        self,
+        existing: Record,
+        filename: str,
+        raw_path: Path,
+        digest: str,
+    ) -> PhotoBrainIngestResponse:
+        image_id = str(existing.id)
+        logger.info(f"[PhotoBrain] Duplicate hash, reusing existing ID {image_id}")
+
+        payload = dict(existing.payload or {})
+        changed = {
+            k: v
+            for k, v in (("filename", filename), ("path_raw", str(raw_path)))
+            if payload.get(k) != v
+        }
+        if changed:
+            await asyncio.to_thread(self.store.update_payload, image_id, changed)
+            payload.update(changed)
+
+        ingested_at = payload.get("ingested_at")
+        return PhotoBrainIngestResponse(
+            id=image_id,
+            filename=payload.get("filename") or filename,
+            path_raw=payload.get("path_raw") or str(raw_path),
+            path_processed=payload.get("path_processed"),
+            hash=digest,
+            hash_alg=payload.get("hash_alg", "sha256"),
+            ocr_text=payload.get("ocr_text"),
+            ocr_confidence=payload.get("ocr_confidence"),
+            embedded=False,
+            timestamp=datetime.fromisoformat(ingested_at) if ingested_at else datetime.now(timezone.utc),
+            metadata=payload,
+        )
+
     async def ingest_image(
         self,
         file: UploadFile,
@@ -132,6 +204,7 @@ class PhotoBrainIngestService:
         """
         Full ingestion pipeline:
         - Save raw image
+        - Duplicate content: refresh the existing record and stop
         - Optional preprocessing
         - Optional OCR
         - Optional auto-tagging (category + tags)
@@ -139,74 +212,68 @@ class PhotoBrainIngestService:
         - Store in Qdrant
         - Return rich metadata response
         """
-        # 1. Save raw
-        raw_path_str = await save_temp_image(file)
+        # 1. Save raw under its content hash (hashed while streaming to disk)
+        raw_path_str, digest = await save_content_addressed(file)
         raw_path = Path(raw_path_str)
+        filename = file.filename or raw_path.name
         logger.info(f"[PhotoBrain] Saved raw image at {raw_path}")
 
+        # Same content already stored: refresh its location fields and skip
+        # preprocessing, OCR, tagging and embedding
+        existing = await asyncio.to_thread(self.store.find_by_hash, digest)
+        if existing is not None:
+            return await self._refresh_duplicate(existing, filename, raw_path, digest)
+
         # 2. Preprocess
         processed_path: Optional[Path] = None
+        ocr_array: Optional[np.ndarray] = None
         if preprocess:
             # If OCR is requested, bias toward OCR pipeline; otherwise vision.
             if ocr:
-                proc_str = preprocess_image_for_ocr(str(raw_path))
+                # Saved too: path_processed is part of the stored payload
+                ocr_array, proc_str = await run_cpu_bound(
+                    preprocess_image_for_ocr, str(raw_path), save=True
+                )
             elif vision:
-                proc_str = preprocess_image_for_vision(str(raw_path))
+                proc_str = await run_cpu_bound(preprocess_image_for_vision, str(raw_path))
             else:
-                proc_str = preprocess_image_for_vision(str(raw_path))
+                proc_str = await run_cpu_bound(preprocess_image_for_vision, str(raw_path))
             processed_path = Path(proc_str)
             logger.info(f"[PhotoBrain] Processed image at {processed_path}")
 
         # Use processed image for embedding / OCR if available, else raw
         work_path = processed_path or raw_path
 
-        # 3. Hash
-        digest = _compute_sha256(raw_path)
-        logger.info(f"[PhotoBrain] SHA256={digest} for {raw_path}")
+        # 3. Hash (computed during the save)
+        logger.info(f"[PhotoBrain] {HASH_ALG}={digest} for {raw_path}")
 
-        # 4. EXIF metadata
-        exif_meta = _extract_exif_metadata(raw_path)
-
-        # 5. OCR
-        ocr_text: Optional[str] = None
-        ocr_conf: Optional[float] = None
+        # 4 + 5. EXIF metadata and OCR are independent; run them together
+        loop = asyncio.get_running_loop()
+        exif_task = asyncio.to_thread(_extract_exif_metadata, raw_path)
         if ocr:
-            ocr_text, ocr_conf = _run_easyocr(work_path)
-
-        # 6. Auto-tagging / categorization
-        autotag_result = None
-        if auto_tag and self.auto_tagger is not None:
-            try:
-                autotag_result = await self.auto_tagger.auto_tag(
-                    str(work_path),
-                    ocr_text=ocr_text,
-                )
-            except Exception as ex:
-                logger.error(f"[PhotoBrain] Auto-tagging failed: {ex}")
-                autotag_result = None
-
-        # 7. Embedding
-        vector = None
-        if embed:
-            try:
-                unified = self.embedder.embed_image_and_text(
-                    str(work_path),
-                    ocr_text or "",
-                )
-                vector = unified.tolist()
-            except Exception as ex:
-                logger.error(f"[PhotoBrain] Embedding failed: {ex}")
-                vector = None
+            ocr_task = loop.run_in_executor(_gpu_pool, _run_easyocr, work_path, ocr_array)
+            exif_meta, (ocr_text, ocr_conf) = await asyncio.gather(exif_task, ocr_task)
+        else:
+            exif_meta = await exif_task
+            ocr_text, ocr_conf = None, None
+
+        # 6 + 7. Auto-tagging (Ollama) and embedding both need the OCR text
+        # but not each other
+        autotag_result, vector = await asyncio.gather(
+            self._auto_tag(work_path, ocr_text) if auto_tag else _none(),
+            self._embed(work_path, ocr_text) if embed else _none(),
+        )
 
         # 8. Build metadata & store
         now = datetime.now(timezone.utc)
         image_id = uuid.uuid4().hex
 
         payload = {
-            "filename": raw_path.name,
+            "filename": filename,
             "path_raw": str(raw_path),
             "path_processed": str(processed_path) if processed_path else None,
             "hash": digest,
+            "hash_alg": HASH_ALG,
             "ingested_at": now.isoformat(),
             "ocr_text": ocr_text,
             "ocr_confidence": ocr_conf,
@@ -224,17 +291,18 @@ class PhotoBrainIngestService:
             }
 
         if vector is not None:
-            self.store.upsert_image(image_id, vector=vector, payload=payload)
+            await asyncio.to_thread(self.store.upsert_image, image_id, vector, payload)
             embedded_flag = True
         else:
             embedded_flag = False
 
         return PhotoBrainIngestResponse(
             id=image_id,
-            filename=raw_path.name,
+            filename=filename,
             path_raw=str(raw_path),
             path_processed=str(processed_path) if processed_path else None,
             hash=digest,
+            hash_alg=HASH_ALG,
             ocr_text=ocr_text,
             ocr_confidence=ocr_conf,
             embedded=embedded_flag,
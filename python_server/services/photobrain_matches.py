@@ -0,0 +1,71 @@
+# python_server/services/photobrain_matches.py
+
+from __future__ import annotations
+
+from typing import Any, Iterable, List
+
+from pydantic import TypeAdapter
+from qdrant_client.http.models import PayloadSelectorInclude
+
+from ..models.photobrain_query_models import PhotoBrainSearchMatch
+
+_EMPTY: dict = {}
+
+# What a match's metadata carries unless the full payload is requested:
+# enough for category/tag/device filters, the CLI and the QA prompt
+_SLIM_METADATA_KEYS = ("category", "tags", "exif")
+
+# Ask Qdrant for only those fields (plus the flat match fields), so raw
+# EXIF and autotag output never leave the server
+SLIM_PAYLOAD = PayloadSelectorInclude(
+    include=[
+        "filename",
+        "path_raw",
+        "path_processed",
+        "hash",
+        "ingested_at",
+        "ocr_text",
+        "ocr_confidence",
+        "category",
+        "tags",
+        "exif.device_model",
+        "exif.datetime_original",
+    ]
+)
+
+# Validating the whole list is one pydantic-core call instead of one
+# model __init__ per match
+_matches_adapter = TypeAdapter(List[PhotoBrainSearchMatch])
+
+
+def points_to_matches(
+    points: Iterable[Any],
+    full_metadata: bool = False,
+) -> List[PhotoBrainSearchMatch]:
+    """
+    Build search matches from Qdrant ScoredPoints. metadata is the whole
+    payload only with full_metadata; otherwise just _SLIM_METADATA_KEYS.
+    """
+    rows = []
+    for p in points:
+        payload = p.payload or _EMPTY
+        get = payload.get
+        if full_metadata:
+            metadata = dict(payload)
+        else:
+            metadata = {k: payload[k] for k in _SLIM_METADATA_KEYS if k in payload}
+        rows.append(
+            {
+                "id": str(p.id),
+                "score": p.score,
+                "filename": get("filename") or "",
+                "path_raw": get("path_raw") or "",
+                "path_processed": get("path_processed"),
+                "hash": get("hash"),
+                "ingested_at": get("ingested_at"),
+                "ocr_text": get("ocr_text"),
+                "ocr_confidence": get("ocr_confidence"),
+                "metadata": metadata,
+            }
+        )
+    return _matches_adapter.validate_python(rows)
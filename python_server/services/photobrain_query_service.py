@@ -2,18 +2,77 @@
 
 from __future__ import annotations
 
-from typing import List
+import json
+from typing import AsyncIterator, List
 
 import httpx
 from loguru import logger
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import SearchParams
 
 from ..config import settings
-from ..models.photobrain_query_models import (
-    PhotoBrainQaResponse,
-    PhotoBrainSearchMatch,
-)
+from ..models.photobrain_query_models import PhotoBrainQaResponse, PhotoBrainSearchMatch
+from .photobrain_batcher import PhotoBrainSearchBatcher
 from .photobrain_embedding import PhotoBrainEmbedder
+from .photobrain_filters import filters_from_question
+from .photobrain_matches import SLIM_PAYLOAD, points_to_matches
+from .photobrain_store import QUANTIZATION_SEARCH
+
+
+# Prompt budget: long OCR bodies are cut per record, then the whole
+# context is capped, so prompt size (and Ollama prefill) stays bounded
+OCR_SNIPPET_CHARS = 800
+MAX_TOTAL_PROMPT_CHARS = 12000
+
+_NO_MATCHES_ANSWER = "I couldn't find any images that appear to answer that question."
+
+
+def _context_block(m: PhotoBrainSearchMatch) -> str:
+    ctx = [f"ID: {m.id}", f"Filename: {m.filename}"]
+    if m.ocr_text:
+        ctx.append("OCR text:")
+        ctx.append(m.ocr_text[:OCR_SNIPPET_CHARS])
+    if m.metadata:
+        # keep metadata small-ish
+        exif = m.metadata.get("exif") or {}
+        device = exif.get("device_model") or exif.get("Model")
+        if device:
+            ctx.append(f"Device: {device}")
+        if "datetime_original" in exif:
+            ctx.append(f"Captured: {exif['datetime_original']}")
+    return "\n".join(ctx)
+
+
+def _build_prompt(question: str, matches: List[PhotoBrainSearchMatch]) -> str:
+    # Stop rendering once the budget is spent; later blocks would be cut anyway
+    context_blocks: list[str] = []
+    size = 0
+    for m in matches:
+        block = _context_block(m)
+        context_blocks.append(block)
+        size += len(block) + 7  # separator
+        if size >= MAX_TOTAL_PROMPT_CHARS:
+            break
+
+    context_str = "\n\n---\n\n".join(context_blocks)[:MAX_TOTAL_PROMPT_CHARS]
+
+    return f"""You are PhotoBrain, an assistant that answers questions based on text extracted from the user's images.
+
+User question:
+{question}
+
+You have the following image records (ID, filename, OCR text, and metadata):
+
+{context_str}
+
+Instructions:
+- Answer the user's question ONLY using the information in these records.
+- If you are not sure, say you cannot find the answer.
+- If a specific ID clearly contains the answer, mention its ID in your explanation.
+- Be concise and direct.
+
+Answer:
+"""
 
 
 class PhotoBrainQueryService:
@@ -24,109 +83,80 @@ class PhotoBrainQueryService:
 
     def __init__(
         self,
-        client: QdrantClient,
+        client: AsyncQdrantClient,
         collection_name: str,
         embedder: PhotoBrainEmbedder,
         qa_model: str | None = None,
         ollama_base_url: str | None = None,
+        batcher: PhotoBrainSearchBatcher | None = None,
     ) -> None:
         self.client = client
         self.collection_name = collection_name
         self.embedder = embedder
+        self.batcher = batcher or PhotoBrainSearchBatcher(client, collection_name)
         self.qa_model = qa_model or getattr(settings, "photobrain_qa_model", None) or "phi4:14b"
         self.ollama_base_url = ollama_base_url or settings.ollama_base_url.rstrip("/")
+        # One pooled client for the process, reused across questions
+        self._http = httpx.AsyncClient(base_url=self.ollama_base_url, timeout=120.0)
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def _retrieve(self, question: str, top_k: int) -> List[PhotoBrainSearchMatch]:
+        # Retrieve relevant images (using text embedding)
+        vec = await self.embedder.embed_text_async(question)
+
+        # QA wants the best few matches, so search wider than Qdrant's
+        # default beam: 8x top_k, at least 128
+        params = SearchParams(hnsw_ef=max(top_k * 8, 128), quantization=QUANTIZATION_SEARCH)
+
+        # Device / recency stated in the question prefilter the search;
+        # ranking within them is still semantic
+        question_filter = filters_from_question(question)
+        if question_filter is not None:
+            logger.info(f"[PhotoBrain/QA] Filter from question: {question_filter}")
+
+        results = await self.batcher.query(
+            vec, top_k, question_filter, params, with_payload=SLIM_PAYLOAD
+        )
+
+        # A misread predicate shouldn't leave the question unanswered
+        if not results and question_filter is not None:
+            logger.info("[PhotoBrain/QA] No matches under question filter; retrying without it")
+            results = await self.batcher.query(vec, top_k, None, params, with_payload=SLIM_PAYLOAD)
+
+        return points_to_matches(results)
 
     async def answer_question(self, question: str, top_k: int = 8) -> PhotoBrainQaResponse:
         logger.info(f"[PhotoBrain/QA] Question: {question!r}, top_k={top_k}")
 
-        # 1) Retrieve relevant images (using text embedding)
-        vec = self.embedder.embed_text(question).astype("float32").tolist()
-
-        results = self.client.query_points(
-            collection_name=self.collection_name,
-            query=vec,
-            limit=top_k,
-            with_payload=True,
-        ).points
-
-        matches: List[PhotoBrainSearchMatch] = []
-        for r in results:
-            payload = r.payload or {}
-            matches.append(
-                PhotoBrainSearchMatch(
-                    id=str(r.id),
-                    score=float(r.score),
-                    filename=payload.get("filename") or "",
-                    path_raw=payload.get("path_raw") or "",
-                    path_processed=payload.get("path_processed"),
-                    hash=payload.get("hash"),
-                    ingested_at=payload.get("ingested_at"),
-                    ocr_text=payload.get("ocr_text"),
-                    ocr_confidence=payload.get("ocr_confidence"),
-                    metadata=payload,
-                )
-            )
+        # 1) Retrieve relevant images
+        matches = await self._retrieve(question, top_k)
 
-        # 2) Build context for LLM
         if not matches:
             logger.info("[PhotoBrain/QA] No matches found; returning fallback answer")
             return PhotoBrainQaResponse(
-                answer="I couldn't find any images that appear to answer that question.",
+                answer=_NO_MATCHES_ANSWER,
                 matches=[],
                 raw_answer="",
             )
 
-        context_blocks: list[str] = []
-        for m in matches:
-            ctx = []
-            ctx.append(f"ID: {m.id}")
-            ctx.append(f"Filename: {m.filename}")
-            if m.ocr_text:
-                ctx.append("OCR text:")
-                ctx.append(m.ocr_text)
-            if m.metadata:
-                # keep metadata small-ish
-                exif = m.metadata.get("exif") or {}
-                device = exif.get("device_model") or exif.get("Model")
-                if device:
-                    ctx.append(f"Device: {device}")
-                if "datetime_original" in exif:
-                    ctx.append(f"Captured: {exif['datetime_original']}")
-            context_blocks.append("\n".join(ctx))
-
-        context_str = "\n\n---\n\n".join(context_blocks)
-
-        prompt = f"""You are PhotoBrain, an assistant that answers questions based on text extracted from the user's images.
-
-User question:
-{question}
-
-You have the following image records (ID, filename, OCR text, and metadata):
-
-{context_str}
-
-Instructions:
-- Answer the user's question ONLY using the information in these records.
-- If you are not sure, say you cannot find the answer.
-- If a specific ID clearly contains the answer, mention its ID in your explanation.
-- Be concise and direct.
-
-Answer:
-"""
+        # 2) Build context for LLM (a few µs once truncated; no need to
+        # leave the event loop for it)
+        prompt = _build_prompt(question, matches)
 
         logger.info(f"[PhotoBrain/QA] Calling Ollama model={self.qa_model}")
 
-        async with httpx.AsyncClient(base_url=self.ollama_base_url, timeout=120.0) as client:
-            resp = await client.post(
-                "/api/generate",
-                json={
-                    "model": self.qa_model,
-                    "prompt": prompt,
-                    "stream": False,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self._http.post(
+            "/api/generate",
+            json={
+                "model": self.qa_model,
+                "prompt": prompt,
+                "stream": False,
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
 
         raw_answer = (data.get("response") or "").strip()
         answer = raw_answer  # For now, we return as-is
@@ -137,3 +167,40 @@ Answer:
             raw_answer=raw_answer,
         )
 
+    async def stream_answer(self, question: str, top_k: int = 8) -> AsyncIterator[str]:
+        """
+        Same as answer_question, but yields the answer text as Ollama
+        generates it, so the caller sees the first tokens right away.
+        """
+        logger.info(f"[PhotoBrain/QA] Streaming question: {question!r}, top_k={top_k}")
+
+        matches = await self._retrieve(question, top_k)
+        if not matches:
+            logger.info("[PhotoBrain/QA] No matches found; returning fallback answer")
+            yield _NO_MATCHES_ANSWER
+            return
+
+        prompt = _build_prompt(question, matches)
+
+        logger.info(f"[PhotoBrain/QA] Streaming from Ollama model={self.qa_model}")
+
+        async with self._http.stream(
+            "POST",
+            "/api/generate",
+            json={
+                "model": self.qa_model,
+                "prompt": prompt,
+                "stream": True,
+            },
+        ) as resp:
+            resp.raise_for_status()
+            # Ollama streams one JSON object per line
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = chunk.get("response")
+                if text:
+                    yield text
+                if chunk.get("done"):
+                    break
@@ -0,0 +1,65 @@
+# python_server/services/photobrain_search_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from ..models.photobrain_filters import PhotoBrainFilterRequest
+from ..models.photobrain_query_models import PhotoBrainSearchMatch
+
+
+def search_cache_key(
+    query: str,
+    top_k: int,
+    filters: Optional[PhotoBrainFilterRequest],
+    version: int,
+    full_metadata: bool = False,
+) -> str:
+    """
+    Key for one search. version is the collection's write counter, so any
+    upsert makes earlier entries unreachable.
+    """
+    filter_dict = filters.model_dump(mode="json", exclude_none=True) if filters else {}
+    h = hashlib.blake2b(digest_size=16)
+    h.update(query.encode())
+    h.update(b"\0%d\0%d\0%d\0" % (top_k, version, full_metadata))
+    h.update(json.dumps(filter_dict, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class SearchResultCache:
+    """
+    Small in-memory LRU of search results with a TTL. The TTL also bounds
+    how stale relative filters (e.g. days=7) can get.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[float, List[PhotoBrainSearchMatch]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[PhotoBrainSearchMatch]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, matches = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own list
+        return list(matches)
+
+    def put(self, key: str, matches: List[PhotoBrainSearchMatch]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(matches))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -2,21 +2,78 @@
 
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, Optional
 
 from loguru import logger
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    Datatype,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    QuantizationSearchParams,
+    Record,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    TextIndexParams,
+    TextIndexType,
+    TokenizerType,
+    VectorParams,
+)
+
+
+# Case-insensitive word match, so "canon eos" hits "Canon EOS R6"
+_DEVICE_TEXT_INDEX = TextIndexParams(
+    type=TextIndexType.TEXT, tokenizer=TokenizerType.WORD, lowercase=True
+)
+
+# Payload fields the search filters (and hash lookups) hit
+_PAYLOAD_INDEXES = {
+    "category": PayloadSchemaType.KEYWORD,
+    "tags": PayloadSchemaType.KEYWORD,
+    "hash": PayloadSchemaType.KEYWORD,
+    "ingested_at": PayloadSchemaType.DATETIME,
+    "ocr_confidence": PayloadSchemaType.FLOAT,
+    "exif.device_model": _DEVICE_TEXT_INDEX,
+    "exif.device_make": _DEVICE_TEXT_INDEX,
+}
+
+# Searches walk the INT8 copies, then rescore a 2x shortlist against the
+# stored originals (FP16 for new collections, FP32 for older ones) so the
+# returned top-k ranks as before. Ignored by collections created without
+# quantization.
+QUANTIZATION_SEARCH = QuantizationSearchParams(rescore=True, oversampling=2.0)
+
+# Per-collection write counters; search caches fold these into their keys
+_versions: Dict[str, int] = {}
+_versions_lock = threading.Lock()
+
+
+def collection_version(collection_name: str) -> int:
+    return _versions.get(collection_name, 0)
+
+
+def _bump_version(collection_name: str) -> None:
+    with _versions_lock:
+        _versions[collection_name] = _versions.get(collection_name, 0) + 1
 
 
 @dataclass
 class PhotoBrainStoreConfig:
     collection_name: str = "photobrain"
     vector_size: int = 768
-    distance: Distance = Distance.COSINE
+    # PhotoBrainEmbedder returns unit-length vectors, so DOT ranks (and
+    # scores) exactly like COSINE without Qdrant normalizing every vector.
+    # Only applies when the collection is created.
+    distance: Distance = Distance.DOT
 
 
 class PhotoBrainStore:
@@ -30,22 +87,42 @@ class PhotoBrainStore:
         self._ensure_collection()
 
     def _ensure_collection(self) -> None:
-        try:
-            self.client.get_collection(self.config.collection_name)
+        # collection_exists works over both REST and gRPC (a missing collection
+        # is an RpcError on gRPC, not UnexpectedResponse)
+        if self.client.collection_exists(self.config.collection_name):
             logger.info(
                 f"[PhotoBrain] Using existing Qdrant collection={self.config.collection_name}"
             )
-        except UnexpectedResponse:
+        else:
             logger.info(
                 f"[PhotoBrain] Creating Qdrant collection={self.config.collection_name}, "
                 f"dim={self.config.vector_size}"
             )
             self.client.create_collection(
                 collection_name=self.config.collection_name,
+                # FP16 originals on disk (only read to rescore; Qdrant
+                # downcasts the FP32 vectors we send); INT8 copies and the
+                # HNSW graph stay in RAM
                 vectors_config=VectorParams(
                     size=self.config.vector_size,
                     distance=self.config.distance,
+                    on_disk=True,
+                    datatype=Datatype.FLOAT16,
                 ),
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8, quantile=0.99, always_ram=True
+                    )
+                ),
+                hnsw_config=HnswConfigDiff(m=16, ef_construct=128, on_disk=False),
+            )
+
+        # Idempotent, so existing collections pick up indexes added later
+        for field, schema in _PAYLOAD_INDEXES.items():
+            self.client.create_payload_index(
+                collection_name=self.config.collection_name,
+                field_name=field,
+                field_schema=schema,
             )
 
     def upsert_image(
@@ -75,7 +152,28 @@ class PhotoBrainStore:
             collection_name=self.config.collection_name,
             points=points,
         )
+        _bump_version(self.config.collection_name)
         logger.info(
             f"[PhotoBrain] Stored image id={id_str} in collection={self.config.collection_name}"
         )
 
+
+    def find_by_hash(self, digest: str) -> Optional[Record]:
+        """Existing point with this content hash (index-backed), if any."""
+        points, _ = self.client.scroll(
+            collection_name=self.config.collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key="hash", match=MatchValue(value=digest))]),
+            limit=1,
+            with_payload=True,
+            with_vectors=False,
+        )
+        return points[0] if points else None
+
+    def update_payload(self, id_str: str, fields: Dict[str, Any]) -> None:
+        """Overwrite just these payload keys; the vector is untouched."""
+        self.client.set_payload(
+            collection_name=self.config.collection_name,
+            payload=fields,
+            points=[id_str],
+        )
+        _bump_version(self.config.collection_name)
@@ -5,70 +5,78 @@ from __future__ import annotations
 from typing import List, Optional
 
 from loguru import logger
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import SearchParams
 
 from ..models.photobrain_query_models import PhotoBrainSearchMatch
 from ..models.photobrain_filters import PhotoBrainFilterRequest
+from .photobrain_batcher import PhotoBrainSearchBatcher
 from .photobrain_embedding import PhotoBrainEmbedder
-from .photobrain_filters import apply_filters
+from .photobrain_filters import apply_filters, filters_to_qdrant
+from .photobrain_matches import SLIM_PAYLOAD, points_to_matches
+from .photobrain_search_cache import SearchResultCache, search_cache_key
+from .photobrain_store import QUANTIZATION_SEARCH, collection_version
 
 
 class PhotoBrainTextSearchService:
     def __init__(
         self,
-        client: QdrantClient,
+        client: AsyncQdrantClient,
         collection_name: str,
         embedder: PhotoBrainEmbedder,
+        batcher: Optional[PhotoBrainSearchBatcher] = None,
     ) -> None:
         self.client = client
         self.collection_name = collection_name
         self.embedder = embedder
+        self.batcher = batcher or PhotoBrainSearchBatcher(client, collection_name)
+        self._cache = SearchResultCache()
 
-    def search(
+    async def search(
         self,
         query: str,
         top_k: int = 12,
-        filters: Optional[PhotoBrainFilterRequest] = None
+        filters: Optional[PhotoBrainFilterRequest] = None,
+        include_full_metadata: bool = False,
     ) -> List[PhotoBrainSearchMatch]:
         logger.info(f"[PhotoBrain/Text] Searching for: {query!r}, top_k={top_k}")
 
-        vec = self.embedder.embed_text(query).astype("float32").tolist()
+        cache_key = search_cache_key(
+            query,
+            top_k,
+            filters,
+            collection_version(self.collection_name),
+            full_metadata=include_full_metadata,
+        )
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[PhotoBrain/Text] Cache hit ({len(cached)} matches)")
+            return cached
 
-        # Retrieve more results if filtering is requested
-        # to compensate for filtered-out items
-        retrieve_k = top_k * 3 if filters else top_k
+        vec = await self.embedder.embed_text_async(query)
 
-        results = self.client.query_points(
-            collection_name=self.collection_name,
-            query=vec,
-            limit=retrieve_k,
-            with_payload=True,
-        ).points
+        # Indexed filters run inside Qdrant's search; only the residual
+        # (case-insensitive / substring) filters need overfetch
+        qdrant_filter, residual = filters_to_qdrant(filters)
+        retrieve_k = top_k * 3 if residual else top_k
 
-        matches: List[PhotoBrainSearchMatch] = []
-        for r in results:
-            payload = r.payload or {}
-            matches.append(
-                PhotoBrainSearchMatch(
-                    id=str(r.id),
-                    score=float(r.score),
-                    filename=payload.get("filename") or "",
-                    path_raw=payload.get("path_raw") or "",
-                    path_processed=payload.get("path_processed"),
-                    hash=payload.get("hash"),
-                    ingested_at=payload.get("ingested_at"),
-                    ocr_text=payload.get("ocr_text"),
-                    ocr_confidence=payload.get("ocr_confidence"),
-                    metadata=payload,
-                )
-            )
+        results = await self.batcher.query(
+            vec,
+            retrieve_k,
+            qdrant_filter,
+            SearchParams(quantization=QUANTIZATION_SEARCH),
+            with_payload=True if include_full_metadata else SLIM_PAYLOAD,
+        )
+
+        matches = points_to_matches(results, full_metadata=include_full_metadata)
 
         # Apply filters
-        filtered_matches = apply_filters(matches, filters)
+        filtered_matches = apply_filters(matches, residual)
         
         # Trim to requested top_k after filtering
         filtered_matches = filtered_matches[:top_k]
 
+        self._cache.put(cache_key, filtered_matches)
         logger.info(f"[PhotoBrain/Text] Found {len(filtered_matches)} matches (after filtering)")
         return filtered_matches
 
@@ -2,19 +2,21 @@
 
 from __future__ import annotations
 
-import hashlib
 import mimetypes
 import os
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Set
 
 import httpx
 from loguru import logger
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileMovedEvent
+from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileMovedEvent
 from watchdog.observers import Observer
 
 from ..config.watcher_config import WatcherSettings, load_watcher_settings
+from ..utils.hashing import hash_path
 
 
 def _guess_mime(path: Path) -> str:
@@ -24,62 +26,83 @@ def _guess_mime(path: Path) -> str:
     return mt
 
 
-def _hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-            h.update(chunk)
-    return h.hexdigest()
-
-
 def _ensure_subdir(base: Path, name: str) -> Path:
     d = base / name
     d.mkdir(parents=True, exist_ok=True)
     return d
 
 
-def _wait_for_stable(path: Path, timeout: float = 30.0, interval: float = 0.5) -> bool:
+class _SeenHashes:
     """
-    Wait until file size stops changing (to avoid ingesting during write).
-    Returns True if stable, False if timeout.
+    Digests of files the watcher has ingested, kept in SQLite so a restart
+    doesn't re-send them. Lookups go through the primary-key index; nothing
+    is held in memory. Shared by all watch-dir handlers.
     """
-    end = time.time() + timeout
-    try:
-        last_size = path.stat().st_size
-    except FileNotFoundError:
-        return False
-
-    while time.time() < end:
-        time.sleep(interval)
-        try:
-            size = path.stat().st_size
-        except FileNotFoundError:
-            return False
-        if size == last_size:
-            return True
-        last_size = size
 
-    return False
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (hash TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        logger.info(f"[Watcher] Seen-hash DB at {db_path}")
+
+    def claim(self, digest: str) -> bool:
+        """Record digest; False if it was already recorded."""
+        with self._lock:
+            cur = self._conn.execute("INSERT OR IGNORE INTO seen (hash) VALUES (?)", (digest,))
+            self._conn.commit()
+            return cur.rowcount == 1
+
+    def release(self, digest: str) -> None:
+        """Forget digest after a failed ingest, so the content can be retried."""
+        with self._lock:
+            self._conn.execute("DELETE FROM seen WHERE hash = ?", (digest,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
 
 class _IngestHandler(FileSystemEventHandler):
-    def __init__(self, settings: WatcherSettings):
+    """
+    Debounces file events per path: every create/modify/move-in restarts
+    that path's timer, and only once it has been quiet for
+    debounce_seconds (i.e. the copy finished) is it handed to the worker
+    pool. The observer thread itself never blocks.
+    """
+
+    def __init__(
+        self,
+        settings: WatcherSettings,
+        seen: _SeenHashes,
+        pool: ThreadPoolExecutor,
+        http: httpx.Client,
+    ):
         super().__init__()
         self.settings = settings
-        self._seen_hashes: Set[str] = set()
+        self._seen = seen
+        self._pool = pool
+        self._http = http
+        self._timers: dict[Path, threading.Timer] = {}
+        self._timers_lock = threading.Lock()
 
     def on_created(self, event):
         if isinstance(event, FileCreatedEvent) and not event.is_directory:
-            self._handle_path(Path(event.src_path))
+            self._schedule(Path(event.src_path))
+
+    def on_modified(self, event):
+        if isinstance(event, FileModifiedEvent) and not event.is_directory:
+            self._schedule(Path(event.src_path))
 
     def on_moved(self, event):
         if isinstance(event, FileMovedEvent) and not event.is_directory:
-            self._handle_path(Path(event.dest_path))
+            self._schedule(Path(event.dest_path))
 
-    def _handle_path(self, path: Path):
+    def _schedule(self, path: Path):
         # Ignore temp/hidden/system-ish files
         if path.name.startswith("~") or path.name.startswith("."):
             return
@@ -87,27 +110,55 @@ class _IngestHandler(FileSystemEventHandler):
         if not path.suffix.lower() in self.settings.image_extensions:
             return
 
-        logger.info(f"[Watcher] Detected new file: {path}")
+        # Our own moves into processed/ and failed/
+        if path.parent.name in (self.settings.processed_subdir, self.settings.failed_subdir):
+            return
+
+        with self._timers_lock:
+            timer = self._timers.get(path)
+            if timer is not None:
+                timer.cancel()
+            else:
+                logger.info(f"[Watcher] Detected new file: {path}")
+            timer = threading.Timer(self.settings.debounce_seconds, self._on_quiet, args=(path,))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
+
+    def _on_quiet(self, path: Path):
+        with self._timers_lock:
+            self._timers.pop(path, None)
+        try:
+            self._pool.submit(self._handle_path, path)
+        except RuntimeError:
+            # Pool already shut down (watcher stopping)
+            pass
+
+    def cancel_pending(self):
+        with self._timers_lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
 
-        # Wait until file is stable
-        if not _wait_for_stable(path):
-            logger.warning(f"[Watcher] File not stable or disappeared: {path}")
+    def _handle_path(self, path: Path):
+        if not path.exists():
+            logger.warning(f"[Watcher] File disappeared before ingest: {path}")
             return
 
         try:
-            digest = _hash_file(path)
+            digest = hash_path(path)
         except Exception as ex:
             logger.error(f"[Watcher] Failed hashing {path}: {ex}")
             return
 
-        if digest in self._seen_hashes:
+        if not self._seen.claim(digest):
             logger.info(f"[Watcher] Duplicate hash, skipping: {path}")
             return
 
-        self._seen_hashes.add(digest)
-        self._ingest_file(path, digest)
+        if not self._ingest_file(path, digest):
+            self._seen.release(digest)
 
-    def _ingest_file(self, path: Path, digest: str):
+    def _ingest_file(self, path: Path, digest: str) -> bool:
         base_dir = path.parent
         processed_dir = _ensure_subdir(base_dir, self.settings.processed_subdir)
         failed_dir = _ensure_subdir(base_dir, self.settings.failed_subdir)
@@ -125,12 +176,13 @@ class _IngestHandler(FileSystemEventHandler):
 
         try:
             with path.open("rb") as f:
+                # httpx streams file fields from the handle in 64 KiB chunks
+                # (length from fstat), so the photo is never held in memory
                 files = {"file": (path.name, f, mime)}
 
-                with httpx.Client(base_url=self.settings.api_base, timeout=300.0) as client:
-                    resp = client.post("/photobrain/ingest", params=params, files=files)
-                    resp.raise_for_status()
-                    data = resp.json()
+                resp = self._http.post("/photobrain/ingest", params=params, files=files)
+                resp.raise_for_status()
+                data = resp.json()
 
             logger.info(
                 f"[Watcher] Ingest OK: {path.name} "
@@ -142,6 +194,7 @@ class _IngestHandler(FileSystemEventHandler):
                 path.rename(dest)
             except Exception as ex_move:
                 logger.warning(f"[Watcher] Failed to move to processed: {ex_move}")
+            return True
 
         except Exception as ex:
             logger.error(f"[Watcher] Ingest FAILED for {path}: {ex}")
@@ -150,19 +203,35 @@ class _IngestHandler(FileSystemEventHandler):
                 path.rename(dest)
             except Exception as ex_move:
                 logger.warning(f"[Watcher] Failed to move to failed: {ex_move}")
+            return False
 
 
 class PhotoBrainWatcher:
     def __init__(self, settings: WatcherSettings | None = None):
         self.settings = settings or load_watcher_settings()
         self.observer = Observer()
+        self.seen = _SeenHashes(self.settings.seen_db_path)
+        self.pool = ThreadPoolExecutor(
+            max_workers=max(1, self.settings.ingest_concurrency),
+            thread_name_prefix="watcher-ingest",
+        )
+        self.handlers: list[_IngestHandler] = []
+        # One keep-alive pool for every upload (thread-safe), instead of a
+        # new connection per file
+        self.http = httpx.Client(
+            base_url=self.settings.api_base,
+            timeout=300.0,
+            http2=self.settings.http2,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        )
 
     def start(self):
         logger.info("[Watcher] Starting PhotoBrain watcher")
         for d in self.settings.watch_dirs:
             d.mkdir(parents=True, exist_ok=True)
             logger.info(f"[Watcher] Watching: {d}")
-            handler = _IngestHandler(self.settings)
+            handler = _IngestHandler(self.settings, self.seen, self.pool, self.http)
+            self.handlers.append(handler)
             self.observer.schedule(handler, str(d), recursive=False)
 
         self.observer.start()
@@ -177,6 +246,12 @@ class PhotoBrainWatcher:
         finally:
             self.observer.stop()
             self.observer.join()
+            for handler in self.handlers:
+                handler.cancel_pending()
+            # Let in-flight ingests finish before closing what they use
+            self.pool.shutdown(wait=True)
+            self.http.close()
+            self.seen.close()
 
 
 def main():
@@ -0,0 +1,29 @@
+import base64
+
+import orjson
+
+from python_server.utils.b64 import b64encode, json_with_images
+
+
+def test_b64encode_matches_stdlib():
+    data = bytes(range(256)) * 5
+    assert b64encode(data) == base64.b64encode(data)
+    assert b64encode(memoryview(data)) == base64.b64encode(data)
+
+
+def test_json_with_images_round_trips():
+    payload = {"model": "llava", "prompt": 'say "hi"\nthen stop', "stream": False}
+    images = [b64encode(b"\x89PNG first"), b64encode(b"second"), b""]
+
+    body = json_with_images(payload, images)
+
+    assert orjson.loads(body) == {**payload, "images": [img.decode() for img in images]}
+
+
+def test_json_with_images_no_images():
+    assert orjson.loads(json_with_images({"model": "m"}, [])) == {"model": "m", "images": []}
+
+
+def test_json_with_images_replaces_existing_images():
+    body = json_with_images({"images": ["stale"], "model": "m"}, [b"QUJD"])
+    assert orjson.loads(body) == {"model": "m", "images": ["QUJD"]}
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from python_server.services.image_preprocess_numba import otsu_binarize
+
+
+@pytest.mark.skipif(otsu_binarize is None, reason="numba not installed")
+@pytest.mark.parametrize("shape", [(1, 1), (7, 13), (480, 640)])
+def test_otsu_matches_opencv(shape):
+    rng = np.random.default_rng(0)
+    # A bimodal image (the Otsu case) and plain noise
+    bimodal = np.clip(
+        np.where(rng.random(shape) < 0.3, rng.normal(60, 20, shape), rng.normal(190, 25, shape)),
+        0,
+        255,
+    ).astype(np.uint8)
+    noise = rng.integers(0, 256, size=shape, dtype=np.uint8)
+
+    for gray in (bimodal, noise):
+        expected_t, expected = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        out = np.empty_like(gray)
+        t = otsu_binarize(gray, out)
+        assert t == int(expected_t)
+        assert np.array_equal(out, expected)
+
+
+@pytest.mark.skipif(otsu_binarize is None, reason="numba not installed")
+def test_otsu_constant_image():
+    gray = np.full((32, 32), 128, dtype=np.uint8)
+    expected_t, expected = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    out = np.empty_like(gray)
+    assert otsu_binarize(gray, out) == int(expected_t)
+    assert np.array_equal(out, expected)
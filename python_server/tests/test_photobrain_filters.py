@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+from python_server.models.photobrain_filters import PhotoBrainFilterRequest
+from python_server.services.photobrain_filters import filters_from_question, filters_to_qdrant
+
+
+def _device(flt):
+    # The device predicate is a nested should-filter over model/make
+    for cond in flt.must:
+        if hasattr(cond, "should") and cond.should:
+            return cond.should[0].match.text
+    return None
+
+
+def _since(flt):
+    for cond in flt.must:
+        if getattr(cond, "key", None) == "ingested_at":
+            return cond.range.gte
+    return None
+
+
+def test_question_without_predicates_has_no_filter():
+    assert filters_from_question("What was the total on my Home Depot receipt?") is None
+
+
+def test_question_device():
+    flt = filters_from_question("Which receipts were shot on my Pixel 8?")
+    assert _device(flt) == "Pixel 8"
+    assert _since(flt) is None
+
+    flt = filters_from_question("photos taken with a Canon EOS R6 in the garage")
+    assert _device(flt) == "Canon EOS R6"
+
+
+def test_question_recency():
+    now = datetime.now(timezone.utc)
+
+    since = _since(filters_from_question("whiteboards from the last 3 weeks"))
+    assert abs(since - (now - timedelta(days=21))) < timedelta(minutes=1)
+
+    since = _since(filters_from_question("anything I scanned this month?"))
+    assert abs(since - (now - timedelta(days=31))) < timedelta(minutes=1)
+
+    since = _since(filters_from_question("What did I photograph yesterday"))
+    assert abs(since - (now - timedelta(days=2))) < timedelta(minutes=1)
+
+
+def test_question_device_and_recency():
+    flt = filters_from_question("serial plates captured with an iPhone 15 Pro last week")
+    assert _device(flt) == "iPhone 15 Pro"
+    assert _since(flt) is not None
+
+
+def test_filters_to_qdrant_none():
+    assert filters_to_qdrant(None) == (None, None)
+
+
+def test_filters_to_qdrant_splits_residual():
+    req = PhotoBrainFilterRequest(
+        category="Receipt",
+        confidence_min=0.5,
+        days=7,
+        tag="Food",
+        contains_text="total",
+    )
+    qdrant_filter, residual = filters_to_qdrant(req)
+
+    keys = {cond.key for cond in qdrant_filter.must}
+    assert keys == {"category", "ocr_confidence", "ingested_at"}
+    category = next(c for c in qdrant_filter.must if c.key == "category")
+    assert category.match.value == "receipt"
+
+    # Only what Qdrant can't express is left for apply_filters
+    assert residual.tag == "Food"
+    assert residual.contains_text == "total"
+    assert residual.category is None and residual.days is None and residual.confidence_min is None
+
+
+def test_filters_to_qdrant_date_range_keeps_undated():
+    date_min = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    qdrant_filter, residual = filters_to_qdrant(PhotoBrainFilterRequest(date_min=date_min))
+    assert residual is None
+
+    (cond,) = qdrant_filter.must
+    in_range, undated = cond.should
+    assert in_range.key == "ingested_at" and in_range.range.gte == date_min
+    assert undated.is_empty.key == "ingested_at"
+
+
+def test_filters_to_qdrant_days_excludes_undated():
+    qdrant_filter, _ = filters_to_qdrant(PhotoBrainFilterRequest(days=3))
+    (cond,) = qdrant_filter.must
+    assert cond.key == "ingested_at" and cond.range.gte is not None
+
+
+def test_filters_to_qdrant_all_indexed():
+    qdrant_filter, residual = filters_to_qdrant(PhotoBrainFilterRequest(category="invoice"))
+    assert qdrant_filter is not None
+    assert residual is None
+
+
+def test_filters_to_qdrant_only_residual():
+    qdrant_filter, residual = filters_to_qdrant(PhotoBrainFilterRequest(device="pixel"))
+    assert qdrant_filter is None
+    assert residual.device == "pixel"
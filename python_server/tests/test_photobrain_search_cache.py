@@ -0,0 +1,51 @@
+from python_server.models.photobrain_filters import PhotoBrainFilterRequest
+from python_server.services import photobrain_search_cache
+from python_server.services.photobrain_search_cache import SearchResultCache, search_cache_key
+
+
+def test_search_cache_key_stable():
+    f1 = PhotoBrainFilterRequest(category="receipt", tags=["a", "b"])
+    f2 = PhotoBrainFilterRequest(tags=["a", "b"], category="receipt")
+    assert search_cache_key("q", 10, f1, 3) == search_cache_key("q", 10, f2, 3)
+
+
+def test_search_cache_key_varies():
+    base = search_cache_key("q", 10, None, 0)
+    assert search_cache_key("q2", 10, None, 0) != base
+    assert search_cache_key("q", 11, None, 0) != base
+    assert search_cache_key("q", 10, None, 1) != base
+    assert search_cache_key("q", 10, None, 0, full_metadata=True) != base
+    assert search_cache_key("q", 10, PhotoBrainFilterRequest(days=7), 0) != base
+    # Empty filters behave like no filters
+    assert search_cache_key("q", 10, PhotoBrainFilterRequest(), 0) == base
+
+
+def test_search_result_cache_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(photobrain_search_cache.time, "monotonic", lambda: now[0])
+
+    cache = SearchResultCache(ttl=60)
+    cache.put("k", ["m"])
+    assert cache.get("k") == ["m"]
+
+    now[0] += 61
+    assert cache.get("k") is None
+
+
+def test_search_result_cache_lru():
+    cache = SearchResultCache(maxsize=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]  # a is now most recent
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1]
+    assert cache.get("c") == [3]
+
+
+def test_search_result_cache_returns_copies():
+    cache = SearchResultCache()
+    cache.put("k", [1, 2])
+    cache.get("k").append(3)
+    assert cache.get("k") == [1, 2]
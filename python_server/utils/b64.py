@@ -0,0 +1,38 @@
+# python_server/utils/b64.py
+
+import base64
+from typing import Sequence
+
+import orjson
+
+try:
+    import pybase64
+except ImportError:  # pragma: no cover - optional speedup
+    pybase64 = None
+
+
+def b64encode(data) -> bytes:
+    """
+    Standard base64 of any bytes-like object (bytes, mmap, ...); SIMD
+    (pybase64) when installed.
+    """
+    if pybase64 is not None:
+        return pybase64.b64encode(data)
+    return base64.b64encode(data)
+
+
+def json_with_images(payload: dict, images_b64: Sequence[bytes]) -> bytes:
+    """
+    JSON body for payload plus an "images" list of base64 strings (Ollama's
+    format). The base64 bytes are spliced in as-is: they hold no characters
+    JSON would escape, so there is no str copy to build and no multi-MB
+    string for orjson to scan.
+    """
+    body = {k: v for k, v in payload.items() if k != "images"}
+    body["images"] = []
+    head = orjson.dumps(body)  # ...,"images":[]}
+    parts = [head[:-2]]
+    for i, img in enumerate(images_b64):
+        parts += (b',"' if i else b'"', img, b'"')
+    parts.append(b"]}")
+    return b"".join(parts)
@@ -0,0 +1,80 @@
+# python_server/utils/batching.py
+
+import asyncio
+from typing import Awaitable, Callable, Sequence
+
+import numpy as np
+
+
+class Coalescer:
+    """
+    Coalesces concurrent calls into batched ones. The first item is run
+    immediately; items that arrive while that batch is in flight go out
+    together (up to max_batch) as soon as it completes.
+
+    run_batch takes a list of items and returns one result per item, in
+    order. If a batch fails, its items are retried one by one so only the
+    bad one fails.
+    """
+
+    def __init__(self, run_batch: Callable[[list], Awaitable[Sequence]], max_batch: int = 16):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self._pending: list = []
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, item):
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((item, fut))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return await fut
+
+    async def _drain(self) -> None:
+        while self._pending:
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            try:
+                results = await self.run_batch([item for item, _ in batch])
+            except Exception as ex:
+                if len(batch) == 1:
+                    _set_exception(batch[0][1], ex)
+                    continue
+                # One bad item must not fail the requests it was batched with
+                for item, fut in batch:
+                    try:
+                        result = (await self.run_batch([item]))[0]
+                    except Exception as item_ex:
+                        _set_exception(fut, item_ex)
+                    else:
+                        _set_result(fut, result)
+            else:
+                for (_, fut), result in zip(batch, results):
+                    _set_result(fut, result)
+
+
+def _set_result(fut: asyncio.Future, result) -> None:
+    if not fut.done():
+        fut.set_result(result)
+
+
+def _set_exception(fut: asyncio.Future, ex: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(ex)
+
+
+class EmbedBatcher(Coalescer):
+    """
+    Coalesces concurrent query embeddings into one batched CLIP forward,
+    run in a worker thread.
+    """
+
+    def __init__(self, embed_batch: Callable[[list], Sequence[np.ndarray]], max_batch: int = 16):
+        super().__init__(self._embed_batch, max_batch)
+        self.embed_batch = embed_batch
+
+    async def _embed_batch(self, items: list) -> Sequence[np.ndarray]:
+        return await asyncio.to_thread(self.embed_batch, items)
+
+    async def embed(self, item) -> np.ndarray:
+        return await self.submit(item)
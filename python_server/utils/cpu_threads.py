@@ -0,0 +1,43 @@
+# python_server/utils/cpu_threads.py
+
+import asyncio
+import os
+from typing import Callable, TypeVar
+
+from loguru import logger
+
+from ..config import settings
+
+T = TypeVar("T")
+
+_CPUS = os.cpu_count() or 1
+
+# At most this many CPU-heavy jobs (OpenCV preprocessing) run at once;
+# the rest wait instead of fighting over cores
+_cpu_jobs = asyncio.Semaphore(max(1, _CPUS // 2))
+
+
+def configure_cpu_threads() -> int:
+    """
+    Cap the intra-op thread pools of torch, OpenCV and BLAS/OpenMP so
+    concurrent requests don't each fan out to every core (N requests x N
+    threads). Call before torch/cv2/numpy are imported: the env vars only
+    take effect for libraries loaded afterwards.
+    """
+    n = settings.cpu_threads or max(1, _CPUS // 4)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(var, str(n))
+
+    import cv2
+    import torch
+
+    torch.set_num_threads(n)
+    cv2.setNumThreads(n)
+    logger.info(f"CPU thread pools capped at {n} (of {_CPUS} cores)")
+    return n
+
+
+async def run_cpu_bound(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking CPU-heavy call in a worker thread, bounded by _cpu_jobs."""
+    async with _cpu_jobs:
+        return await asyncio.to_thread(fn, *args, **kwargs)
@@ -0,0 +1,59 @@
+# python_server/utils/hashing.py
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Union
+
+try:
+    from blake3 import blake3
+except ImportError:  # pragma: no cover - optional speedup
+    blake3 = None
+
+
+# Content fingerprint (dedupe / content addressing), not a security
+# boundary. Stored next to each digest as hash_alg so mixed collections
+# stay unambiguous.
+HASH_ALG = "blake3" if blake3 is not None else "sha256"
+
+# Above this, BLAKE3 hashes an mmap of the file across threads
+_MMAP_MIN_SIZE = 10 << 20  # 10 MiB
+_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def new_hasher():
+    """Incremental hasher for HASH_ALG, for data hashed while it streams."""
+    return blake3() if blake3 is not None else hashlib.sha256()
+
+
+def hash_bytes(data: bytes) -> str:
+    """Hex digest (HASH_ALG) of an in-memory buffer."""
+    h = new_hasher()
+    h.update(data)
+    return h.hexdigest()
+
+
+def hash_path(path: Union[str, Path]) -> str:
+    """Hex digest (HASH_ALG) of a file's contents."""
+    path = os.fspath(path)
+    if blake3 is not None:
+        if os.stat(path).st_size >= _MMAP_MIN_SIZE:
+            return blake3(max_threads=blake3.AUTO).update_mmap(path).hexdigest()
+        h = blake3()
+        with open(path, "rb", buffering=0) as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    # Python 3.11+: read+hash loop runs in C with the GIL released
+    if hasattr(hashlib, "file_digest"):
+        with open(path, "rb", buffering=0) as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
@@ -1,26 +1,201 @@
+import asyncio
+import functools
+import io
+import itertools
 import os
-from datetime import datetime
+import sys
+import tempfile
+import time
 from pathlib import Path
+from typing import Optional, Tuple
+
 from fastapi import UploadFile
+from loguru import logger
 
 from ..config import settings
+from .hashing import new_hasher
+
+_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Per-process sequence for upload names; with the pid, unique across
+# workers without touching the filesystem
+_counter = itertools.count()
+
+
+def thumbs_dir() -> Path:
+    """Directory for RAG thumbnails, served by the app under /thumbs."""
+    path = Path(settings.storage_dir).resolve() / "thumbs"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@functools.cache
+def _images_dir() -> Path:
+    # Resolved and created once per process rather than per upload
+    path = Path(settings.storage_dir).resolve() / "images"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _new_image_path(file: UploadFile) -> Path:
+    ext = os.path.splitext(file.filename or "upload.png")[1] or ".png"
+    name = f"img_{int(time.time())}_{os.getpid()}_{next(_counter):08x}{ext}"
+    return _images_dir() / name
+
+
+def _on_disk_fd(src) -> Optional[int]:
+    # Only Linux sendfile accepts a regular file as out_fd (macOS/BSD need
+    # a socket, and have no copy_file_range)
+    if not sys.platform.startswith("linux"):
+        return None
+    # Still in memory; fileno() would force it to roll over to disk
+    if isinstance(src, tempfile.SpooledTemporaryFile) and isinstance(src._file, io.BytesIO):
+        return None
+    try:
+        return src.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+def _kernel_copy(src_fd: int, dst_path: Path, size: int) -> None:
+    # copy_file_range can share extents (reflink) or copy in-kernel; it
+    # refuses some fd pairs (e.g. across filesystems on older kernels),
+    # in which case sendfile does the in-kernel copy instead. A sendfile
+    # error propagates; the caller then copies in chunks.
+    copy_range = getattr(os, "copy_file_range", None)
+    fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        offset = 0
+        while offset < size:
+            if copy_range is not None:
+                try:
+                    n = copy_range(src_fd, fd, size - offset, offset)
+                except OSError:
+                    copy_range = None
+                    continue
+            else:
+                n = os.sendfile(fd, src_fd, offset, size - offset)
+            if n == 0:
+                break
+            offset += n
+    finally:
+        os.close(fd)
+
 
 async def save_temp_image(file: UploadFile) -> str:
-    storage_root = Path(settings.storage_dir).resolve()
-    images_dir = storage_root / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
+    """
+    Copy an upload to a new file under images/.
+
+    Uploads big enough to have been spooled to disk are copied file-to-file
+    in the kernel, never passing through Python. Smaller ones are streamed
+    in 1 MiB chunks. Either way the work runs in a worker thread to keep
+    the event loop free.
+    """
+    full_path = _new_image_path(file)
     
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    ext = os.path.splitext(file.filename or "upload.png")[1] or ".png"
-    name = f"img_{ts}{ext}"
-    full_path = images_dir / name
+    src = file.file
+    src_fd = _on_disk_fd(src)
+    copied = False
+    if src_fd is not None:
+        try:
+            src.flush()
+            await asyncio.to_thread(_kernel_copy, src_fd, full_path, os.fstat(src_fd).st_size)
+            copied = True
+        except OSError as ex:
+            logger.warning("Kernel copy of upload failed ({}); copying in chunks", ex)
+            await file.seek(0)
     
-    content = await file.read()
-    with open(full_path, "wb") as f:
-        f.write(content)
+    if not copied:
+        # open/close can block on slow disks too, not just the writes
+        f = await asyncio.to_thread(open, full_path, "wb")
+        try:
+            while chunk := await file.read(_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
     
     # Reset file pointer so other consumers could re-read if needed
     await file.seek(0)
     
     return str(full_path)
 
+
+def _write_uncached(path: Path, data: bytes) -> None:
+    # Flush, then drop the file's pages so write-only copies don't push
+    # models/indexes out of the page cache (DONTNEED skips dirty pages,
+    # hence the fdatasync first). Plain write where fadvise is missing.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if hasattr(os, "posix_fadvise"):
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+async def write_temp_image(file: UploadFile, data: bytes, drop_cache: bool = False) -> str:
+    """
+    Write an upload's already-read bytes to a new file under images/.
+
+    drop_cache=True for copies nothing will read back soon (audit only):
+    the written pages are evicted from the page cache.
+    """
+    full_path = _new_image_path(file)
+    if drop_cache:
+        await asyncio.to_thread(_write_uncached, full_path, data)
+    else:
+        await asyncio.to_thread(full_path.write_bytes, data)
+    return str(full_path)
+
+
+def _hash_and_write(h, f, chunk: bytes) -> None:
+    h.update(chunk)
+    f.write(chunk)
+
+
+def _place_content_addressed(tmp_name: str, images_dir: Path, digest: str, ext: str) -> Path:
+    shard_dir = images_dir / digest[:2]
+    shard_dir.mkdir(exist_ok=True)
+    full_path = shard_dir / f"{digest}{ext}"
+    if full_path.exists():
+        os.unlink(tmp_name)
+    else:
+        os.replace(tmp_name, full_path)
+    return full_path
+
+
+async def save_content_addressed(file: UploadFile) -> Tuple[str, str]:
+    """
+    Store an upload under its content hash (HASH_ALG):
+    images/<digest[:2]>/<digest><ext>.
+
+    The upload is streamed in 1 MiB chunks into a temp file while being
+    hashed, then renamed into place; if that content is already stored the
+    temp file is dropped instead, so duplicates cost no extra disk space.
+    Hashing, writes and the final rename run in a worker thread.
+    Returns (path, hex digest).
+    """
+    images_dir = _images_dir()
+    ext = os.path.splitext(file.filename or "upload.png")[1].lower() or ".png"
+    h = new_hasher()
+    
+    fd, tmp_name = tempfile.mkstemp(dir=images_dir, prefix=".upload_", suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(_CHUNK_SIZE):
+                await asyncio.to_thread(_hash_and_write, h, f, chunk)
+        
+        digest = h.hexdigest()
+        full_path = await asyncio.to_thread(
+            _place_content_addressed, tmp_name, images_dir, digest, ext
+        )
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    
+    await file.seek(0)
+    
+    return str(full_path), digest
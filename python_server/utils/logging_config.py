@@ -3,5 +3,7 @@ from loguru import logger
 
 def configure_logging():
     logger.remove()
-    logger.add(sys.stderr, level="INFO", backtrace=False, diagnose=False)
+    # enqueue: records go on a queue drained by a writer thread, so request
+    # handlers never block on stderr
+    logger.add(sys.stderr, level="INFO", backtrace=False, diagnose=False, enqueue=True)
 
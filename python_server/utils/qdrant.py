@@ -0,0 +1,50 @@
+# python_server/utils/qdrant.py
+
+import os
+import threading
+
+from loguru import logger
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from ..config import settings
+
+# One client (and so one gRPC channel) per process, shared by RAG and PhotoBrain
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _client_kwargs() -> dict:
+    url = settings.qdrant_url or os.getenv("QDRANT_URL", "http://localhost:6333")
+    logger.info(
+        f"Connecting to Qdrant at {url} "
+        f"({'gRPC' if settings.qdrant_prefer_grpc else 'REST'})"
+    )
+    return dict(
+        url=url,
+        api_key=settings.qdrant_api_key or os.getenv("QDRANT_API_KEY") or None,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        timeout=settings.qdrant_timeout,
+    )
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Lazy-create the shared QdrantClient (thread-safe)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = QdrantClient(**_client_kwargs())
+    return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    Lazy-create the shared AsyncQdrantClient, for request-path queries
+    awaited on the event loop rather than run in worker threads.
+    """
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncQdrantClient(**_client_kwargs())
+    return _async_client
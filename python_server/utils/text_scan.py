@@ -0,0 +1,89 @@
+# python_server/utils/text_scan.py
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+try:
+    import numba
+    from numba import njit
+except ImportError:  # pragma: no cover - optional speedup
+    numba = None
+
+
+if numba is not None:
+
+    _TAGS = np.frombuffer(b"tags", dtype=np.uint8)
+    _KEYWORDS = np.frombuffer(b"keywords", dtype=np.uint8)
+
+    @njit(cache=True, nogil=True)
+    def _starts_with_ci(buf, i, word):
+        # word is lowercase ASCII; | 0x20 folds A-Z onto a-z
+        if i + word.shape[0] > buf.shape[0]:
+            return False
+        for j in range(word.shape[0]):
+            if (buf[i + j] | 0x20) != word[j]:
+                return False
+        return True
+
+    @njit(cache=True, nogil=True)
+    def _break_len(buf, i):
+        # Length of the str.splitlines() line break at buf[i] (UTF-8), or 0
+        b = buf[i]
+        if b == 10 or b == 11 or b == 12 or b == 13 or 28 <= b <= 30:
+            return 1
+        n = buf.shape[0]
+        if b == 0xC2 and i + 1 < n and buf[i + 1] == 0x85:  # U+0085
+            return 2
+        if b == 0xE2 and i + 2 < n and buf[i + 1] == 0x80 and (buf[i + 2] == 0xA8 or buf[i + 2] == 0xA9):
+            return 3  # U+2028, U+2029
+        return 0
+
+    @njit(cache=True, nogil=True)
+    def _find_tag_line(buf, tags, keywords):
+        n = buf.shape[0]
+        i = 0
+        while True:
+            if _starts_with_ci(buf, i, tags):
+                label_end = i + tags.shape[0]
+            elif _starts_with_ci(buf, i, keywords):
+                label_end = i + keywords.shape[0]
+            else:
+                label_end = -1
+            k = i
+            while k < n:
+                b = buf[k]
+                # Cheap byte filter first; every break starts with one of these
+                if (b <= 30 or b == 0xC2 or b == 0xE2) and _break_len(buf, k) > 0:
+                    break
+                k += 1
+            if label_end >= 0:
+                return label_end, k
+            if k >= n:
+                return -1, -1
+            i = k + _break_len(buf, k)
+
+    def find_tag_line(text: str) -> Optional[str]:
+        """
+        Rest of the first line (as split by str.splitlines) that starts with
+        "tags" or "keywords" in any ASCII case, after that label. None if
+        there is no such line.
+        """
+        data = text.encode("utf-8")
+        start, end = _find_tag_line(np.frombuffer(data, dtype=np.uint8), _TAGS, _KEYWORDS)
+        if start < 0:
+            return None
+        return data[start:end].decode("utf-8")
+
+    # Compile (or load from the on-disk cache) up front, not on the first request
+    try:
+        find_tag_line("warm up\nTags: a")
+    except Exception as ex:  # pragma: no cover - broken numba install
+        logger.warning(f"Numba tag scan unavailable, using regex: {ex}")
+        find_tag_line = None
+
+else:
+    find_tag_line = None